@@ -7,8 +7,10 @@ import re
 from core.logger import log
 # 🚀 REMOVED MASTER_PROMPT import to protect your trade secret
 from core.config import SAMPLE_JSON
-from core.excel_builder import ExcelBuilder
-from core.ai_extractor import AIExtractor
+from core.result_cache import ResultCache, file_fingerprint
+from core.dedup import PerceptualHashIndex
+# 🚀 ExcelBuilder (openpyxl) and AIExtractor (PyMuPDF + Gemini SDK) are imported on first use,
+# so a cold start or a rerun that never clicks a button doesn't pay for them.
 
 # --- UI Configuration ---
 st.set_page_config(page_title="HindiScan AI", page_icon="📄", layout="wide")
@@ -31,10 +33,71 @@ if use_legacy_font:
     st.warning(f"⚠️ Note: You must have the '{legacy_font_choice}' font installed on your PC to read the final Excel file.")
 st.markdown("---")
 
+@st.cache_resource(show_spinner=False)
+def get_shared_extractor():
+    """One extractor (and its HTTP connection pool) for the app's own key, reused across reruns and sessions."""
+    from core.ai_extractor import AIExtractor
+    return AIExtractor()
+
+def get_extractor(custom_api_key=None):
+    # BYOK keys are never put in a shared cache (Zero-Trust): build a fresh, session-local client instead
+    if custom_api_key:
+        from core.ai_extractor import AIExtractor
+        return AIExtractor(api_key=custom_api_key)
+    return get_shared_extractor()
+
+# What one session may keep in server memory between reruns (the privacy notice quotes these numbers)
+SESSION_MAX_DOCUMENTS = 3
+SESSION_MAX_DEDUP_PAGES = 50
+
+def get_result_cache():
+    """Per-session store of extracted JSON and rendered workbooks (see core.result_cache)."""
+    if "result_cache" not in st.session_state:
+        st.session_state["result_cache"] = ResultCache(max_documents=SESSION_MAX_DOCUMENTS)
+    return st.session_state["result_cache"]
+
+def get_dedup_index():
+    """Per-session near-duplicate page index: pages are only ever reused within the same user's batch."""
+    if "dedup_index" not in st.session_state:
+        st.session_state["dedup_index"] = PerceptualHashIndex(max_entries=SESSION_MAX_DEDUP_PAGES)
+    return st.session_state["dedup_index"]
+
+def forget_session_documents():
+    """Drops every extraction, workbook and page fingerprint this session holds in server memory."""
+    if "result_cache" in st.session_state:
+        st.session_state["result_cache"].clear()
+    if "dedup_index" in st.session_state:
+        st.session_state["dedup_index"].clear()
+    st.session_state.pop("active_extraction", None)
+
 def sanitize_filename(name):
     clean_name = re.sub(r'[\\/*?:"<>|]', "", name)
     return clean_name.strip().replace(" ", "_")[:50]
 
+def render_workbook(extracted_json, use_legacy_font, legacy_font_name, default_filename):
+    """Runs ExcelBuilder on a payload and returns (safe_filename, xlsx_bytes)."""
+    from core.excel_builder import ExcelBuilder
+    raw_filename = extracted_json.get("recommended_filename", default_filename)
+    safe_filename = sanitize_filename(raw_filename) + ".xlsx"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_json_path = os.path.join(temp_dir, "input.json")
+        temp_excel_path = os.path.join(temp_dir, safe_filename)
+
+        with open(temp_json_path, 'w', encoding='utf-8') as f:
+            json.dump(extracted_json, f)
+
+        builder = ExcelBuilder(
+            json_path=temp_json_path,
+            output_path=temp_excel_path,
+            use_legacy_font=use_legacy_font,
+            legacy_font_name=legacy_font_name
+        )
+        builder.build()
+
+        with open(temp_excel_path, "rb") as f:
+            return safe_filename, f.read()
+
 # Deep Security & Size Validation
 def validate_security_and_size(uploaded_file):
     """Checks the 5MB limit and verifies the file's raw Magic Bytes."""
@@ -57,7 +120,17 @@ def validate_security_and_size(uploaded_file):
     else:
         raise ValueError("Security Alert: Invalid file signature. This is not a genuine Image or PDF.")
 
-tab1, tab2 = st.tabs(["🧩 Option 1: Paste JSON (Manual)", "📸 Option 2: Upload File (API)"])
+def validate_workbook(uploaded_file):
+    """Legacy workbooks are parsed locally (no API call), so they get a larger limit than scans."""
+    if uploaded_file.size > 20971520:
+        raise ValueError("File exceeds the 20MB strict limit.")
+    header = uploaded_file.read(4)
+    uploaded_file.seek(0)
+    # .xlsx is a ZIP container
+    if not header.startswith(b'PK\x03\x04'):
+        raise ValueError("Security Alert: Invalid file signature. This is not a genuine .xlsx workbook.")
+
+tab1, tab2, tab3 = st.tabs(["🧩 Option 1: Paste JSON (Manual)", "📸 Option 2: Upload File (API)", "🔤 Option 3: Legacy Excel (Kruti Dev)"])
 
 # ==========================================
 # TAB 1: MANUAL JSON TO EXCEL
@@ -91,31 +164,12 @@ with tab1:
                 if "document" not in parsed_json and "pages" not in parsed_json:
                     raise ValueError("Schema Error: Missing 'document' or 'pages' root key.")
                 
-                raw_filename = parsed_json.get("recommended_filename", "Structured_Hindi_Report")
-                safe_filename = sanitize_filename(raw_filename) + ".xlsx"
-                
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_json_path = os.path.join(temp_dir, "input.json")
-                    temp_excel_path = os.path.join(temp_dir, safe_filename)
-                    
-                    with open(temp_json_path, 'w', encoding='utf-8') as f:
-                        json.dump(parsed_json, f)
-                        
-                    with st.spinner(f"Building {safe_filename}..."):
-                        builder = ExcelBuilder(
-                            json_path=temp_json_path, 
-                            output_path=temp_excel_path,
-                            use_legacy_font=use_legacy_font,
-                            legacy_font_name=legacy_font_choice
-                        )
-                        builder.build()
-                        
-                        with open(temp_excel_path, "rb") as f:
-                            excel_data = f.read()
-                            
-                    log.info(f"Successfully generated {safe_filename}")
-                    st.success(f"✅ Report successfully generated as **{safe_filename}**!")
-                    st.download_button(label="📥 Download Excel File", data=excel_data, file_name=safe_filename)
+                with st.spinner("Building Excel report..."):
+                    safe_filename, excel_data = render_workbook(parsed_json, use_legacy_font, legacy_font_choice, "Structured_Hindi_Report")
+
+                log.info(f"Successfully generated {safe_filename}")
+                st.success(f"✅ Report successfully generated as **{safe_filename}**!")
+                st.download_button(label="📥 Download Excel File", data=excel_data, file_name=safe_filename)
             
             except Exception as e:
                 log.error(f"Failed to generate report: {str(e)}\n{traceback.format_exc()}")
@@ -142,67 +196,70 @@ with tab2:
     extract_tables_only = st.checkbox("📊 **Extract Tables Only** (Ignore paragraphs, headers, and footers)", value=False)
     
     uploaded_file = st.file_uploader("Upload Document (JPG/PNG/PDF)", type=['jpg', 'jpeg', 'png', 'pdf'])
+    # 🚀 Removing the file removes everything this session remembers about it (and any earlier documents)
+    if uploaded_file is None:
+        forget_session_documents()
 
-    st.caption("🔒 **Privacy & Security Notice:** This tool uses Google's Gemini AI to analyze the layout and text of your document. Your file is processed securely in temporary memory and is **instantly deleted** from our servers the moment your Excel file is generated. We do not store your documents.")
+    st.caption(f"🔒 **Privacy & Security Notice:** This tool uses Google's Gemini AI to analyze the layout and text of your document. Your file is only written to a temporary folder while the AI reads it, and that copy is deleted right after. So the same document is never processed twice, its extracted data, page fingerprints and generated Excel files stay in this session's server memory (at most {SESSION_MAX_DOCUMENTS} documents, never on disk, never shared with other users). All of it is **deleted as soon as you remove the file** or your session ends.")
 
     st.info("ℹ️ **AI Confidence Notice:** This system uses advanced Vision AI to process complex layouts and handwriting. While highly accurate, poor image lighting or illegible handwriting may occasionally affect the output. Please perform a quick visual review of the generated Excel file.")
     
     if st.button("✨ Auto-Extract & Build Excel", type="primary", key="extract_btn"):
         if not uploaded_file:
             st.warning("⚠️ Please upload a document first.")
-        elif use_custom_key and not custom_api_key:
-            st.error("❌ You selected 'Use my own key' but didn't enter one.")
         else:
             try:
                 detected_mime_type = validate_security_and_size(uploaded_file)
-                
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_doc_path = os.path.join(temp_dir, uploaded_file.name)
-                    with open(temp_doc_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    
-                    with st.spinner("🤖 AI is analyzing the document... (This takes 30-60 seconds)"):
-                        extractor = AIExtractor(api_key=custom_api_key)
-                        progress_bar = st.progress(0, text="Preparing pages...")
-                        def update_progress(current_page, total_pages):
-                            progress_fraction = current_page / total_pages
-                            progress_bar.progress(progress_fraction, text=f"Processing page {current_page + 1} of {total_pages}...")
-                        extracted_json = extractor.process_document(temp_doc_path, detected_mime_type, extract_tables_only, progress_callback=update_progress)
-                        # Clear the progress bar when complete
-                        progress_bar.empty()
-                    
-                    with st.spinner("📊 Building Smart Excel File..."):
-                        if "pages" not in extracted_json and "document" not in extracted_json:
-                            raise ValueError("AI Output Error: Missing valid root keys.")
-                        
-                        raw_filename = extracted_json.get("recommended_filename", "AI_Extracted_Report")
-                        safe_filename = sanitize_filename(raw_filename) + ".xlsx"
-                        
-                        temp_json_path = os.path.join(temp_dir, "ai_output.json")
-                        temp_excel_path = os.path.join(temp_dir, safe_filename)
-                        
-                        with open(temp_json_path, 'w', encoding='utf-8') as f:
-                            json.dump(extracted_json, f)
-                            
-                        builder = ExcelBuilder(
-                            json_path=temp_json_path, 
-                            output_path=temp_excel_path, 
-                            use_legacy_font=use_legacy_font,
-                            legacy_font_name=legacy_font_choice
-                        )
-                        builder.build()
-                        
-                        with open(temp_excel_path, "rb") as f:
-                            excel_data = f.read()
-                            
-                    st.success(f"✅ Report successfully generated as **{safe_filename}**!")
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.download_button(label="📥 Download Excel File", data=excel_data, file_name=safe_filename)
-                    with col2:
-                        with st.expander("👀 View Raw AI JSON Data"):
-                            st.json(extracted_json)
+                result_cache = get_result_cache()
+                cache_key = ResultCache.extraction_key(file_fingerprint(uploaded_file.getbuffer()), extract_tables_only)
+
+                # 🚀 Same file + same mode already extracted in this session: skip the 30-60 second model call
+                if cache_key in result_cache:
+                    log.info("Reusing cached extraction for this session (no API call).")
+                    st.toast("♻️ Reused this document's earlier extraction. No API quota used.")
+                elif use_custom_key and not (custom_api_key and custom_api_key.strip()):
+                    raise ValueError("You selected 'Use my own key' but didn't enter one.")
+                else:
+                    with tempfile.TemporaryDirectory() as temp_dir:
+                        temp_doc_path = os.path.join(temp_dir, uploaded_file.name)
+                        with open(temp_doc_path, "wb") as f:
+                            f.write(uploaded_file.getbuffer())
+
+                        with st.spinner("🤖 AI is analyzing the document... (This takes 30-60 seconds)"):
+                            extractor = get_extractor(custom_api_key)
+                            progress_bar = st.progress(0, text="Preparing pages...")
+                            progress_state = {"page": 0, "total": 1, "rows": {}}
+                            def render_progress():
+                                rows_received = sum(progress_state["rows"].values())
+                                rows_text = f" ({rows_received} rows received)" if rows_received else ""
+                                progress_bar.progress(progress_state["page"] / progress_state["total"], text=f"Processing page {progress_state['page'] + 1} of {progress_state['total']}...{rows_text}")
+                            def update_progress(current_page, total_pages):
+                                progress_state.update(page=current_page, total=total_pages)
+                                render_progress()
+                            # 🚀 Streaming mode: rows show up in the progress text while the page is still generating
+                            def update_rows(page_idx, event):
+                                if event["type"] == "restart":
+                                    progress_state["rows"][page_idx] = 0
+                                elif event["type"] == "rollback":
+                                    progress_state["rows"][page_idx] = max(0, progress_state["rows"].get(page_idx, 0) - event["rows"])
+                                    render_progress()
+                                elif event["type"] == "row":
+                                    progress_state["rows"][page_idx] = progress_state["rows"].get(page_idx, 0) + 1
+                                    render_progress()
+                            # The extractor is shared across sessions: this job's stats come back through the callback
+                            run_stats = {}
+                            extracted_json = extractor.process_document(temp_doc_path, detected_mime_type, extract_tables_only, progress_callback=update_progress, row_callback=update_rows, dedup_index=get_dedup_index(), stats_callback=run_stats.update)
+                            # Clear the progress bar when complete
+                            progress_bar.empty()
+                            duplicates = run_stats.get("dedup", {}).get("duplicates")
+                            if duplicates:
+                                st.toast(f"♻️ {len(duplicates)} near-duplicate page(s) reused without an API call.")
+
+                    if "pages" not in extracted_json and "document" not in extracted_json:
+                        raise ValueError("AI Output Error: Missing valid root keys.")
+                    result_cache.put_extraction(cache_key, extracted_json)
+
+                st.session_state["active_extraction"] = cache_key
 
             except ValueError as ve:
                 st.error(f"❌ {str(ve)}")
@@ -220,6 +277,72 @@ with tab2:
                     log.error(f"Option 2 Failed: {error_str}\n{traceback.format_exc()}")
                     st.error(f"❌ An unexpected error occurred: {error_str}")
 
+    # 🚀 Results live outside the button: changing export settings only re-runs ExcelBuilder (or hits the render cache)
+    active_key = st.session_state.get("active_extraction")
+    if uploaded_file and active_key and active_key == ResultCache.extraction_key(file_fingerprint(uploaded_file.getbuffer()), extract_tables_only):
+        result_cache = get_result_cache()
+        extracted_json = result_cache.get_extraction(active_key)
+        if extracted_json is not None:
+            try:
+                variant = ResultCache.render_variant(use_legacy_font, legacy_font_choice)
+                rendered = result_cache.get_render(active_key, variant)
+                if rendered is None:
+                    with st.spinner("📊 Building Smart Excel File..."):
+                        rendered = render_workbook(extracted_json, use_legacy_font, legacy_font_choice, "AI_Extracted_Report")
+                    result_cache.put_render(active_key, variant, *rendered)
+                safe_filename, excel_data = rendered
+
+                st.success(f"✅ Report successfully generated as **{safe_filename}**!")
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.download_button(label="📥 Download Excel File", data=excel_data, file_name=safe_filename)
+                with col2:
+                    with st.expander("👀 View Raw AI JSON Data"):
+                        st.json(extracted_json)
+            except Exception as e:
+                log.error(f"Option 2 Excel build failed: {str(e)}\n{traceback.format_exc()}")
+                st.error(f"❌ An unexpected error occurred: {str(e)}")
+
+# ==========================================
+# TAB 3: LEGACY FONT WORKBOOK INGEST (NO API)
+# ==========================================
+with tab3:
+    st.subheader("Convert a Kruti Dev / DevLys Excel File")
+    st.markdown("Upload an existing .xlsx typed in a legacy font (Max 20MB). It is read locally and rebuilt as a clean Unicode report, with no AI call and no API quota used.")
+
+    legacy_file = st.file_uploader("Upload Legacy Workbook (XLSX)", type=['xlsx'], key="legacy_upload")
+
+    if st.button("🔄 Convert Workbook", type="primary", key="legacy_btn"):
+        if not legacy_file:
+            st.warning("⚠️ Please upload a workbook first.")
+        else:
+            try:
+                validate_workbook(legacy_file)
+                from core.legacy_ingest import ingest_legacy_workbook
+                with st.spinner("Reading workbook..."):
+                    with tempfile.TemporaryDirectory() as temp_dir:
+                        temp_xlsx_path = os.path.join(temp_dir, "legacy.xlsx")
+                        with open(temp_xlsx_path, "wb") as f:
+                            f.write(legacy_file.getbuffer())
+                        default_name = os.path.splitext(legacy_file.name)[0] + "_Unicode"
+                        ingested_json = ingest_legacy_workbook(temp_xlsx_path, recommended_filename=default_name)
+                    safe_filename, excel_data = render_workbook(ingested_json, use_legacy_font, legacy_font_choice, default_name)
+
+                log.info(f"Option 3: converted legacy workbook into {safe_filename}")
+                st.success(f"✅ Converted {len(ingested_json['pages'])} sheet(s) into **{safe_filename}**!")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.download_button(label="📥 Download Excel File", data=excel_data, file_name=safe_filename, key="legacy_download")
+                with col2:
+                    with st.expander("👀 View Converted JSON Data"):
+                        st.json(ingested_json)
+            except ValueError as ve:
+                st.error(f"❌ {str(ve)}")
+            except Exception as e:
+                log.error(f"Option 3 Failed: {str(e)}\n{traceback.format_exc()}")
+                st.error(f"❌ An unexpected error occurred: {str(e)}")
+
 # Footer
 st.markdown("---")
 st.markdown(
@@ -0,0 +1,321 @@
+"""
+Reproducible performance baselines for the post-extraction pipeline.
+
+Generates synthetic Hindi documents of growing size (pages x tables x rows x text length)
+and measures wall time, peak memory and throughput for each stage:
+
+    heal      -> AIExtractor._parse_page_output (markdown strip + json_repair + auto-heal)
+    font      -> unicode_to_krutidev over every text cell
+    build     -> ExcelBuilder.build (Unicode / Nirmala UI)
+    legacy    -> ExcelBuilder.build with Kruti Dev conversion
+    autofit   -> column_widths over every rendered sheet (the per-sheet autofit scan)
+
+Usage:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --sizes small,medium --json bench.json
+    python -m benchmarks.bench_pipeline --compare bench.json --threshold 0.20
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from core.logger import log
+from core.font_converter import unicode_to_krutidev
+from core.excel_builder import ExcelBuilder, render_sheet, column_widths
+
+# (pages, tables per page, rows per table, words per cell)
+SIZE_PRESETS = {
+    "tiny": (1, 1, 10, 2),
+    "small": (2, 2, 25, 3),
+    "medium": (5, 2, 60, 4),
+    "large": (10, 3, 120, 5),
+    "xlarge": (25, 3, 200, 6),
+}
+DEFAULT_SIZES = ["tiny", "small", "medium", "large"]
+STAGES = ["heal", "font", "build", "legacy", "autofit"]
+
+# Deliberately exercises reph, chhoti ee, half letters, conjuncts and punctuation
+HINDI_WORDS = [
+    "ग्रामीण", "क्षेत्र", "लाभार्थियों", "सम्बन्धित", "द्वितीय", "किश्त", "परिषद", "ब्लॉक",
+    "आई.डी.", "माता/संरक्षक", "विद्यालय", "प्रधानाचार्य", "शिक्षा", "जिला", "कार्यालय",
+    "धनराशि", "स्वीकृत", "(हाँ)", "[नहीं]", "योजना", "पंजीकरण", "श्रमिक", "त्रैमासिक",
+]
+
+
+def make_document(pages, tables, rows, words_per_cell, seed=42):
+    """Builds a deterministic multi-page payload matching the AIExtractor output schema."""
+    rng = random.Random(seed)
+
+    def text(n):
+        return " ".join(rng.choice(HINDI_WORDS) for _ in range(n))
+
+    all_pages = []
+    for page_idx in range(pages):
+        doc_tables = []
+        for table_idx in range(tables):
+            cols = rng.randint(4, 8)
+            headers = [{"column_name": text(2), "is_bold": True} for _ in range(cols)]
+            body = []
+            for row_idx in range(rows):
+                row = [str(row_idx + 1)] + [text(words_per_cell) for _ in range(cols - 1)]
+                body.append(row)
+            doc_tables.append({"table_title": text(3), "headers": headers, "rows": body})
+
+        all_pages.append({
+            "recommended_filename": f"Synthetic_Page_{page_idx + 1}",
+            "document": {
+                "main_title": {"text": text(6), "is_bold": True, "font_size": 14},
+                "subtitles": [{"text": text(8), "is_bold": True, "font_size": 12}],
+                "tables": doc_tables,
+                "footer": {"text": "नोट:- " + text(20), "is_bold": False, "font_size": 11},
+            },
+        })
+    return {"recommended_filename": "Synthetic_Report", "pages": all_pages}
+
+
+def make_raw_outputs(payload):
+    """Renders each page as the messy text the model really sends: fenced and without the 'document' wrapper."""
+    raw = []
+    for page in payload["pages"]:
+        flattened = dict(page["document"])
+        flattened["recommended_filename"] = page["recommended_filename"]
+        body = json.dumps(flattened, ensure_ascii=False)
+        # Trailing comma forces json_repair to do real work instead of a plain json.loads
+        raw.append(f"Here is your data:\n```json\n{body[:-1]},}}\n```\n")
+    return raw
+
+
+def count_units(payload):
+    rows = cells = chars = 0
+    for page in payload["pages"]:
+        for table in page["document"]["tables"]:
+            rows += len(table["rows"])
+            for row in table["rows"]:
+                cells += len(row)
+                chars += sum(len(value) for value in row)
+    return {"pages": len(payload["pages"]), "rows": rows, "cells": cells, "chars": chars}
+
+
+def iter_text_cells(payload):
+    for page in payload["pages"]:
+        document = page["document"]
+        yield document["main_title"]["text"]
+        for subtitle in document["subtitles"]:
+            yield subtitle["text"]
+        for table in document["tables"]:
+            yield table["table_title"]
+            for header in table["headers"]:
+                yield header["column_name"]
+            for row in table["rows"]:
+                yield from row
+        yield document["footer"]["text"]
+
+
+class StageRunner:
+    """Prepares inputs for every stage once so only the stage itself is measured."""
+
+    def __init__(self, payload, work_dir):
+        self.payload = payload
+        self.work_dir = work_dir
+        self.json_path = os.path.join(work_dir, "input.json")
+        self.output_path = os.path.join(work_dir, "output.xlsx")
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        self.raw_outputs = make_raw_outputs(payload)
+        self.text_cells = list(iter_text_cells(payload))
+        self._extractor = None
+        self._sheets = None
+
+    def setup(self, stage):
+        if stage == "heal" and self._extractor is None:
+            # Heavy SDK import stays out of the timings; no network call is ever made
+            from core.ai_extractor import AIExtractor
+            self._extractor = AIExtractor(api_key="BENCHMARK_KEY")
+        elif stage == "autofit" and self._sheets is None:
+            self._sheets = []
+            for page in self.payload["pages"]:
+                spec = render_sheet(page["document"])
+                merged = {(row, col) for row, last_col in spec.merges for col in range(1, last_col + 1)}
+                self._sheets.append((spec.cells, merged))
+
+    def run(self, stage):
+        if stage == "heal":
+            for idx, raw in enumerate(self.raw_outputs):
+                self._extractor._parse_page_output(raw, idx)
+        elif stage == "font":
+            for value in self.text_cells:
+                unicode_to_krutidev(value)
+        elif stage == "build":
+            ExcelBuilder(self.json_path, self.output_path).build()
+        elif stage == "legacy":
+            ExcelBuilder(self.json_path, self.output_path, use_legacy_font=True).build()
+        elif stage == "autofit":
+            for cells, merged in self._sheets:
+                column_widths(cells, merged)
+        else:
+            raise ValueError(f"Unknown benchmark stage: {stage}")
+
+
+def measure(runner, stage, repeat):
+    """Returns wall-time samples and the peak traced memory for one stage."""
+    runner.setup(stage)
+    runner.run(stage)  # warm-up: regex compilation, lazy imports, allocator pools
+
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        runner.run(stage)
+        samples.append(time.perf_counter() - start)
+
+    # Separate traced run so tracemalloc overhead never leaks into the timings
+    gc.collect()
+    tracemalloc.start()
+    runner.run(stage)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return samples, peak
+
+
+def run_suite(sizes, stages, repeat, seed=42):
+    results = []
+    for size_name, (pages, tables, rows, words) in sizes:
+        payload = make_document(pages, tables, rows, words, seed=seed)
+        units = count_units(payload)
+        with tempfile.TemporaryDirectory() as work_dir:
+            runner = StageRunner(payload, work_dir)
+            for stage in stages:
+                samples, peak = measure(runner, stage, repeat)
+                median = statistics.median(samples)
+                results.append({
+                    "size": size_name,
+                    "stage": stage,
+                    "shape": {"pages": pages, "tables": tables, "rows": rows, "words_per_cell": words},
+                    "units": units,
+                    "repeat": repeat,
+                    "wall_median_s": median,
+                    "wall_min_s": min(samples),
+                    "wall_max_s": max(samples),
+                    "peak_mem_bytes": peak,
+                    "rows_per_s": units["rows"] / median if median else None,
+                    "cells_per_s": units["cells"] / median if median else None,
+                })
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Flags any (size, stage) whose median wall time or peak memory grew beyond the threshold."""
+    base_index = {(r["size"], r["stage"]): r for r in baseline.get("results", [])}
+    rows, regressions = [], []
+    for result in results:
+        base = base_index.get((result["size"], result["stage"]))
+        if base is None:
+            continue
+        time_delta = result["wall_median_s"] / base["wall_median_s"] - 1 if base["wall_median_s"] else 0.0
+        mem_delta = result["peak_mem_bytes"] / base["peak_mem_bytes"] - 1 if base["peak_mem_bytes"] else 0.0
+        entry = {"size": result["size"], "stage": result["stage"], "time_delta": time_delta, "mem_delta": mem_delta}
+        rows.append(entry)
+        if time_delta > threshold or mem_delta > threshold:
+            regressions.append(entry)
+    return rows, regressions
+
+
+def parse_sizes(spec, custom):
+    if custom:
+        pages, tables, rows, words = (int(part) for part in custom.split("x"))
+        return [(f"custom_{custom}", (pages, tables, rows, words))]
+    names = [name.strip() for name in spec.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SIZE_PRESETS]
+    if unknown:
+        raise ValueError(f"Unknown size preset(s): {', '.join(unknown)}. Choose from {', '.join(SIZE_PRESETS)}.")
+    return [(name, SIZE_PRESETS[name]) for name in names]
+
+
+def print_table(results, comparison=None):
+    deltas = {(r["size"], r["stage"]): r for r in (comparison or [])}
+    header = f"{'size':<10} {'stage':<8} {'rows':>7} {'median ms':>10} {'peak MiB':>9} {'rows/s':>11}"
+    if comparison is not None:
+        header += f" {'Δtime':>8} {'Δmem':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = (
+            f"{r['size']:<10} {r['stage']:<8} {r['units']['rows']:>7} "
+            f"{r['wall_median_s'] * 1000:>10.2f} {r['peak_mem_bytes'] / 1048576:>9.2f} "
+            f"{(r['rows_per_s'] or 0):>11.0f}"
+        )
+        delta = deltas.get((r["size"], r["stage"]))
+        if delta:
+            line += f" {delta['time_delta']:>+8.1%} {delta['mem_delta']:>+8.1%}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HindiScan post-processing pipeline.")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help=f"Comma separated presets: {', '.join(SIZE_PRESETS)}")
+    parser.add_argument("--custom", help="Custom shape as PAGESxTABLESxROWSxWORDS, e.g. 3x2x50x4")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma separated stages: {', '.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per stage (median is reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_out", help="Write machine-readable results to this path")
+    parser.add_argument("--compare", help="Baseline JSON produced by --json to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Allowed relative slowdown before failing (0.20 = 20%%)")
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stage(s): {', '.join(unknown)}")
+    sizes = parse_sizes(args.sizes, args.custom)
+
+    # Per-page INFO/WARNING lines would dominate the timings of the small stages
+    previous_level = log.level
+    log.setLevel(logging.ERROR)
+    try:
+        results = run_suite(sizes, stages, args.repeat, seed=args.seed)
+    finally:
+        log.setLevel(previous_level)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    comparison, regressions = None, []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison, regressions = compare(results, baseline, args.threshold)
+
+    print_table(results, comparison)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json_out}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for entry in regressions:
+            print(f"  {entry['size']}/{entry['stage']}: time {entry['time_delta']:+.1%}, memory {entry['mem_delta']:+.1%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,170 @@
 import os
 import json
 import re
-import fitz 
 import time
-import json_repair
-from google import genai
-from google.genai import types
-from dotenv import load_dotenv
-from core.logger import log
-from core.config import MASTER_PROMPT, SAMPLE_JSON, TABLES_ONLY_PROMPT 
+import queue
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from core.lazy import LazyModule
+from core.env import load_env_once
+from core.logger import log, log_context, new_job_id, set_log_page
+from core.config import MASTER_PROMPT, SAMPLE_JSON, TABLES_ONLY_PROMPT, CONTINUATION_PROMPT, TILE_PROMPT_NOTE
+from core.model_router import ModelRouter, page_quality_issues
+from core.hedging import HedgedCaller
+from core.key_pool import KeyPool, is_rate_limit_error
+from core.stream_parser import IncrementalTableParser
+from core import tiling
+from core import dedup
+from core.prompt_cache import PromptCache, is_cache_error
 
-load_dotenv()
+# 🚀 Heavy SDKs are only imported on first use (keeps cold start and the "Paste JSON" path fast)
+fitz = LazyModule("fitz")
+json_repair = LazyModule("json_repair")
+genai = LazyModule("google.genai")
+types = LazyModule("google.genai.types")
+
+# 🚀 Cheap, low-latency first tier; pages only escalate to the strong model when cheap checks fail
+FAST_MODEL_NAME = 'gemini-2.5-flash-lite'
+STRONG_MODEL_NAME = 'gemini-3-flash-preview'
+
+MAX_OUTPUT_TOKENS = 8192
+# How many continuation requests a truncated streamed page may make before we keep what we have
+MAX_STREAM_RESUMES = 2
+
+# The static prompt prefix of every page request, per extraction mode (what the prompt cache stores)
+STATIC_PROMPTS = {
+    "full": f"{MASTER_PROMPT}\n\nEXPECTED JSON SCHEMA:\n{SAMPLE_JSON}",
+    "tables_only": f"{TABLES_ONLY_PROMPT}\n\nEXPECTED JSON SCHEMA:\n{SAMPLE_JSON}",
+}
+
+def _finish_reason(response):
+    candidates = getattr(response, "candidates", None)
+    if isinstance(candidates, (list, tuple)) and candidates:
+        return getattr(candidates[0], "finish_reason", None)
+    return None
+
+def _is_max_tokens(finish_reason):
+    # The SDK returns an enum (FinishReason.MAX_TOKENS); compare by name so plain strings work too
+    return finish_reason is not None and str(finish_reason).upper().endswith("MAX_TOKENS")
+
+def _drain_events(events, row_callback):
+    while events is not None:
+        try:
+            idx, event = events.get_nowait()
+        except queue.Empty:
+            return
+        row_callback(idx, event)
+
+def _header_names(table):
+    return [h.get("column_name", "") if isinstance(h, dict) else str(h) for h in table.get("headers", []) or []]
+
+def _trim_to_complete_rows(tables, parser):
+    """Drops the half-written row (and anything after it) that json_repair invented for a truncated table."""
+    tables = [table for table in tables if isinstance(table, dict)]
+    open_table = parser.open_table
+    if parser.is_complete or open_table is None or open_table >= len(tables):
+        return tables
+    tables = tables[:open_table + 1]
+    tables[open_table]["rows"] = [list(row) for row in parser.rows.get(open_table, [])]
+    if open_table in parser.headers:
+        tables[open_table]["headers"] = parser.headers[open_table]
+    return tables
+
+def _merge_continuation(tables, resumed_tables):
+    """Appends a continuation answer: rows of the interrupted table first, then any later tables."""
+    if not resumed_tables:
+        return
+    first, target = resumed_tables[0], tables[-1]
+    if not first.get("headers") or _header_names(first) == _header_names(target):
+        target_rows = target.setdefault("rows", [])
+        new_rows = first.get("rows", []) or []
+        # Models sometimes repeat the row they were told was last
+        while new_rows and target_rows and new_rows[0] == target_rows[-1]:
+            new_rows = new_rows[1:]
+        target_rows.extend(new_rows)
+        resumed_tables = resumed_tables[1:]
+    tables.extend(resumed_tables)
+
+def _routing_summary(stats):
+    tiers = stats.get("routing", {}).get("tiers", {})
+    return ", ".join(f"{model}: {t['accepted']}/{t['calls']} accepted, mean {t['mean_latency_s']}s" for model, t in tiers.items() if t["calls"])
+
+class ExtractionRun:
+    """State of one process_document call: its routing decisions and tiled pages. Never shared between jobs."""
+
+    def __init__(self, tiers):
+        self.router = ModelRouter(tiers)
+        self.tiled_pages = {}
 
 class AIExtractor:
-    def __init__(self, api_key=None):
-        self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
-        if not self.api_key or not self.api_key.strip():
+    def __init__(self, api_key=None, model_routing=None, hedge_requests=None, api_keys=None, stream=None, tiling_enabled=None, dedup_pages=None, prompt_cache=None):
+        load_env_once()
+        # 🚀 A BYOK key always runs alone; otherwise pool every configured key (GEMINI_API_KEYS, comma separated).
+        # A blank BYOK key is an error, never a silent switch to the app's own quota
+        if api_key is not None:
+            if not api_key.strip():
+                log.error("API Key missing.")
+                raise ValueError("No API Key provided. Please enter a valid Gemini API Key.")
+            keys = [api_key]
+        elif api_keys:
+            keys = list(api_keys)
+        else:
+            keys = os.environ.get("GEMINI_API_KEYS", "").split(",") + [os.environ.get("GEMINI_API_KEY") or ""]
+        keys = list(dict.fromkeys(key.strip() for key in keys if key and key.strip()))
+        if not keys:
             log.error("API Key missing.")
             raise ValueError("No API Key provided. Please enter a valid Gemini API Key.")     
         
-        self.client = genai.Client(api_key=self.api_key.strip())
+        self.key_pool = KeyPool(
+            keys,
+            client_factory=lambda key: genai.Client(api_key=key),
+            requests_per_minute=float(os.environ.get("GEMINI_KEY_RPM", 12)),
+            quarantine_seconds=float(os.environ.get("GEMINI_KEY_QUARANTINE_SECONDS", 60)),
+        )
+        self.api_key = keys[0]
+        self.client = self.key_pool.keys[0].client
         #self.model_name = 'gemini-2.5-flash'
-        self.model_name = 'gemini-3-flash-preview'
+        self.model_name = os.environ.get("GEMINI_MODEL", STRONG_MODEL_NAME)
+        self.fast_model_name = os.environ.get("GEMINI_FAST_MODEL", FAST_MODEL_NAME)
+
+        if model_routing is None:
+            model_routing = os.environ.get("GEMINI_MODEL_ROUTING", "1") != "0"
+        # Each job routes through its own ModelRouter over these tiers (see ExtractionRun)
+        self.model_tiers = [self.fast_model_name, self.model_name] if model_routing and self.fast_model_name != self.model_name else [self.model_name]
+
+        # 🚀 Optional hedging: duplicate a page request that outlives the recent p95 (bounded by a hedge budget)
+        if hedge_requests is None:
+            hedge_requests = os.environ.get("GEMINI_HEDGE_REQUESTS", "0") == "1"
+        self.hedger = None
+        if hedge_requests:
+            self.hedger = HedgedCaller(
+                percentile=float(os.environ.get("GEMINI_HEDGE_PERCENTILE", 0.95)),
+                budget_ratio=float(os.environ.get("GEMINI_HEDGE_BUDGET", 0.1)),
+            )
+
+        # 🚀 Streaming mode: rows are parsed and reported as they arrive, and truncated pages resume mid-table
+        if stream is None:
+            stream = os.environ.get("GEMINI_STREAMING", "0") == "1"
+        self.stream = stream
+
+        # 🚀 Optional: dense registers are split into row bands so no single request hits the output token cap
+        if tiling_enabled is None:
+            tiling_enabled = os.environ.get("GEMINI_TILING", "0") == "1"
+        self.tiling_enabled = tiling_enabled
+        self.tile_rows = int(os.environ.get("GEMINI_TILE_ROWS", 25))
+        self.dense_row_threshold = int(os.environ.get("GEMINI_DENSE_ROW_THRESHOLD", 40))
+
+        # 🚀 Optional: duplicate pages (forwarded / recompressed copies) reuse an earlier page's JSON
+        if dedup_pages is None:
+            dedup_pages = os.environ.get("GEMINI_DEDUP", "0") == "1"
+        self.dedup_threshold = int(os.environ.get("GEMINI_DEDUP_THRESHOLD", dedup.DEFAULT_THRESHOLD)) if dedup_pages else None
+
+        # 🚀 Optional server-side cache of the static prompt prefix: pages then only send their image
+        if prompt_cache is None:
+            prompt_cache = os.environ.get("GEMINI_PROMPT_CACHE", "0") == "1"
+        self.prompt_cache = None
+        if prompt_cache:
+            self.prompt_cache = PromptCache(ttl_seconds=int(os.environ.get("GEMINI_PROMPT_CACHE_TTL", 3600)))
 
     def _clean_json_response(self, text):
         clean_text = text.strip()
@@ -30,8 +173,268 @@ class AIExtractor:
             return match.group(1).strip()
         return clean_text
 
+    def _parse_page_output(self, raw_output, idx):
+        """Cleans, repairs and auto-heals one page of raw model output into a page payload."""
+        return self._parse_page_output_with_status(raw_output, idx)[0]
+
+    def _parse_page_output_with_status(self, raw_output, idx):
+        """Same as _parse_page_output, plus whether the output was actually readable (False = degraded placeholder)."""
+        parse_ok = True
+        clean_json_string = self._clean_json_response(raw_output)
+        #parsed_data = json_repair.loads(clean_json_string)
+
+        # 🚀 FIX 1: Use json_repair to auto-fix missing quotes or trailing commas
+        try:
+            parsed_data = json_repair.loads(clean_json_string)
+        except Exception as parse_error:
+            log.error(f"Page {idx+1} JSON Repair Failed: {parse_error}")
+            parse_ok = False
+            # 🚀 FIX 2: Graceful Degradation (Don't crash the whole PDF)
+            parsed_data = {
+                "tables": [{"headers": [{"column_name": "Error"}], "rows": [[f"Failed to parse page {idx+1}. AI generated invalid structure."]]}]
+            }
+
+        if "document" not in parsed_data:
+            log.warning(f"Page {idx+1}: AI missed the 'document' wrapper. Auto-healing...")
+            valid_root_keys = ["tables", "main_title", "subtitles", "footer"]
+            if any(key in parsed_data for key in valid_root_keys):
+                filename = parsed_data.pop("recommended_filename", f"Extracted_Page_{idx+1}")
+                parsed_data = {"recommended_filename": filename, "document": parsed_data}
+            else:
+                parse_ok = False
+                parsed_data = {"document": {"tables": []}}
+                #raise ValueError(f"Page {idx+1}: AI returned unreadable structure. Keys found: {list(parsed_data.keys())}")
+
+        return parsed_data, parse_ok
+
+    def _call_model(self, model_name, contents, parser=None):
+        """One generate call on the least-loaded pooled key; a 429 quarantines that key and retries on another.
+
+        With a parser the SDK's streaming call is used and every chunk is fed to it as it arrives.
+        Returns (text, finish_reason).
+        """
+        for attempt in range(self.key_pool.size):
+            key = self.key_pool.acquire()
+            start = time.perf_counter()
+            try:
+                scope, cached_name = self._cached_prefix(key, model_name, contents)
+                if cached_name is None:
+                    result = self._send(key, model_name, contents, self._generate_config(), parser)
+                else:
+                    try:
+                        remainder = contents[0][len(STATIC_PROMPTS[scope]):].strip()
+                        cached_contents = ([remainder] if remainder else []) + list(contents[1:])
+                        result = self._send(key, model_name, cached_contents, self._generate_config(cached_name), parser)
+                    except Exception as e:
+                        if not is_cache_error(e):
+                            raise
+                        log.warning(f"{key.label}: cached prompt {cached_name} was rejected ({e}). Sending the full prompt.")
+                        self.prompt_cache.invalidate(key.label, model_name, scope)
+                        result = self._send(key, model_name, contents, self._generate_config(), parser)
+            except Exception as e:
+                self.key_pool.release(key, time.perf_counter() - start, error=e)
+                if not is_rate_limit_error(e) or self.key_pool.available_keys() == 0:
+                    raise
+                log.warning(f"{key.label} hit the rate limit. Quarantined, retrying on another key...")
+                continue
+            self.key_pool.release(key, time.perf_counter() - start)
+            return result
+        raise RuntimeError("429 RESOURCE_EXHAUSTED: every configured API key is rate limited. Try again shortly.")
+
+    def _generate_config(self, cached_name=None):
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            temperature=0.1,
+            max_output_tokens=MAX_OUTPUT_TOKENS,
+            cached_content=cached_name,
+        )
+
+    def _send(self, key, model_name, contents, config, parser=None):
+        if parser is None:
+            response = key.client.models.generate_content(model=model_name, contents=contents, config=config)
+            return response.text, _finish_reason(response)
+        # A 429 retry on another key or an inline resend after a rejected cache reuses the parser:
+        # drop what the failed attempt streamed so rows aren't counted twice or mistaken for a truncation
+        parser.reset()
+        chunks, finish_reason = [], None
+        for chunk in key.client.models.generate_content_stream(model=model_name, contents=contents, config=config):
+            text = chunk.text or ""
+            chunks.append(text)
+            parser.feed(text)
+            finish_reason = _finish_reason(chunk) or finish_reason
+        return "".join(chunks), finish_reason
+
+    def _cached_prefix(self, key, model_name, contents):
+        """(scope, cache name) when the request starts with a static prompt that is cached for this key."""
+        if self.prompt_cache is None or not contents or not isinstance(contents[0], str):
+            return None, None
+        for scope, prompt in STATIC_PROMPTS.items():
+            if contents[0].startswith(prompt):
+                return scope, self.prompt_cache.cached_name(key.label, key.client, model_name, scope, prompt)
+        return None, None
+
+    def _generate_page(self, idx, model_name, full_prompt, document_part, on_event=None):
+        """Raw model text for one page (streamed and resumed after truncation when streaming is on)."""
+        contents = [full_prompt, document_part]
+        if not self.stream:
+            return self._call_model(model_name, contents)[0]
+
+        if on_event:
+            on_event({"type": "restart", "model": model_name})
+        parser = IncrementalTableParser(on_event)
+        raw_output, finish_reason = self._call_model(model_name, contents, parser=parser)
+        if raw_output and (not parser.is_complete or _is_max_tokens(finish_reason)) and parser.headers:
+            log.warning(f"Page {idx+1}: output truncated after {sum(len(r) for r in parser.rows.values())} rows. Resuming mid-table...")
+            return self._resume_truncated_page(idx, model_name, contents, raw_output, parser, on_event)
+        return raw_output
+
+    def _resume_truncated_page(self, idx, model_name, contents, raw_output, parser, on_event):
+        """Keeps every complete row of a truncated answer and asks the model for the rest, table by table."""
+        page = self._parse_page_output(raw_output, idx)
+        document = page["document"]
+        tables = _trim_to_complete_rows(document.get("tables") or [], parser)
+
+        for _ in range(MAX_STREAM_RESUMES):
+            if not tables:
+                break
+            table_number = len(tables) - 1
+            last_row = tables[-1]["rows"][-1] if tables[-1].get("rows") else "(no rows yet)"
+            continuation = CONTINUATION_PROMPT.format(table_number=table_number + 1, last_row=json.dumps(last_row, ensure_ascii=False))
+
+            # Continuation table 0 is the interrupted table: shift event indices so progress lines up
+            shifted = (lambda event: on_event(dict(event, table=event["table"] + table_number) if "table" in event else event)) if on_event else None
+            resume_parser = IncrementalTableParser(shifted)
+            resume_output, finish_reason = self._call_model(model_name, contents + [continuation], parser=resume_parser)
+            if not resume_output:
+                break
+
+            resumed = self._parse_page_output(resume_output, idx)["document"]
+            resumed_tables = _trim_to_complete_rows(resumed.get("tables") or [], resume_parser)
+            _merge_continuation(tables, resumed_tables)
+            if resumed.get("footer") and not document.get("footer"):
+                document["footer"] = resumed["footer"]
+            if resume_parser.is_complete and not _is_max_tokens(finish_reason):
+                break
+
+        document["tables"] = tables
+        return json.dumps(page, ensure_ascii=False)
+
+    def _extract_page(self, run, idx, img_bytes, full_prompt, on_event=None):
+        """Routes one page through the model tiers, escalating only when the cheap checks fail."""
+        document_part = types.Part.from_bytes(data=img_bytes, mime_type="image/jpeg")
+        last_tier = len(run.router.tiers) - 1
+
+        for tier, model_name in enumerate(run.router.tiers):
+            # Hot-path lines are DEBUG with lazy %-formatting: free when the level is INFO or above
+            log.debug("Sending Page %d to %s...", idx + 1, model_name)
+            start = time.perf_counter()
+            try:
+                # Streamed calls are never hedged: two copies would report every row twice
+                if self.hedger and not self.stream:
+                    raw_output = self.hedger.call(lambda: self._generate_page(idx, model_name, full_prompt, document_part), key=model_name)
+                else:
+                    raw_output = self._generate_page(idx, model_name, full_prompt, document_part, on_event)
+            except Exception as e:
+                if tier == last_tier:
+                    raise
+                run.router.record(idx + 1, tier, time.perf_counter() - start, ["api_error"], accepted=False)
+                log.warning(f"Page {idx+1}: {model_name} failed ({e}). Escalating...")
+                continue
+
+            # 🚀 FIX 2: Catch NoneType timeouts from the API before cleaning
+            if not raw_output:
+                if tier == last_tier:
+                    raise ValueError(f"Page {idx+1}: AI returned a blank response. This is usually caused by API rate limits or server timeouts.")
+                run.router.record(idx + 1, tier, time.perf_counter() - start, ["blank_response"], accepted=False)
+                continue
+
+            parsed_data, parse_ok = self._parse_page_output_with_status(raw_output, idx)
+            issues = page_quality_issues(parsed_data, parse_failed=not parse_ok)
+            accepted = not issues or tier == last_tier
+            run.router.record(idx + 1, tier, time.perf_counter() - start, issues, accepted)
+
+            if accepted:
+                return parsed_data
+            log.info(f"Page {idx+1}: escalating from {model_name} ({', '.join(issues)}).")
+
+    def _extract_page_in_context(self, run, idx, img_bytes, full_prompt, on_event=None):
+        set_log_page(idx + 1)
+        tiles = self._plan_dense_page(idx, img_bytes)
+        if tiles:
+            return self._extract_tiled_page(run, idx, tiles, img_bytes, full_prompt, on_event)
+        return self._extract_page(run, idx, img_bytes, full_prompt, on_event)
+
+    def _plan_dense_page(self, idx, img_bytes):
+        """Tile images for a dense page, or None when the page fits comfortably in one request."""
+        if not self.tiling_enabled:
+            return None
+        try:
+            plan = tiling.plan_page_tiles(img_bytes, rows_per_tile=self.tile_rows, dense_row_threshold=self.dense_row_threshold)
+            if not plan or len(plan) < 2:
+                return None
+            return tiling.render_tiles(img_bytes, plan)
+        except Exception as e:
+            # Tiling is an optimisation: any imaging problem falls back to the whole-page request
+            log.warning(f"Page {idx+1}: tiling skipped ({e}).")
+            return None
+
+    def _extract_tiled_page(self, run, idx, tiles, img_bytes, full_prompt, on_event=None):
+        """Extracts the row bands of one dense page in parallel and stitches them into a single page.
+
+        When the tiles don't continue one table under identical headers (a misplaced header band,
+        a header the model read differently), the stitched page would split into several tables:
+        the whole page is extracted in one request instead.
+        """
+        log.info(f"Page {idx+1}: dense table detected, extracting {len(tiles)} tiles in parallel.")
+        prompts = [f"{full_prompt}\n\n{TILE_PROMPT_NOTE.format(tile_number=n + 1, tile_count=len(tiles))}" for n in range(len(tiles))]
+
+        with ThreadPoolExecutor(max_workers=min(len(tiles), max(2, self.key_pool.size)), thread_name_prefix="tile") as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._extract_page, run, idx, tile, prompt)
+                for tile, prompt in zip(tiles, prompts)
+            ]
+            tile_pages = [future.result() for future in futures]
+        if not tiling.tiles_agree(tile_pages):
+            log.warning(f"Page {idx+1}: tile headers don't line up. Extracting the whole page in one request.")
+            return self._extract_page(run, idx, img_bytes, full_prompt, on_event)
+        run.tiled_pages[idx + 1] = len(tiles)
+        return tiling.merge_tile_pages(tile_pages)
+
     # 🚀 NEW: Added progress_callback parameter
-    def process_document(self, file_path, mime_type, extract_tables_only=False, progress_callback=None):
+    def process_document(self, file_path, mime_type, extract_tables_only=False, progress_callback=None, job_id=None, row_callback=None, dedup_index=None, stats_callback=None):
+        """Extracts every page into the multi-page schema.
+
+        row_callback(page_idx, event) receives streamed table events ({"type": "headers" | "row" | "restart" | "rollback", ...})
+        on the caller's thread while pages are still generating (streaming mode only).
+        dedup_index is a PerceptualHashIndex shared by one batch (e.g. one user session); without it
+        near-duplicates are only detected inside this document.
+        stats_callback(stats) receives this job's stats (routing, keys, tiling, dedup, ...) once it succeeds.
+        """
+        job_id = job_id or new_job_id()
+        # Every record logged during this job (including per-page lines) carries the same correlation ID
+        with log_context(job_id=job_id):
+            return self._extract_document(file_path, mime_type, extract_tables_only, progress_callback, row_callback, dedup_index, job_id, stats_callback)
+
+    def _find_duplicate_pages(self, images_to_process, index, scope, job_id):
+        """Hashes every page before upload: returns {page_idx: matched entry} and {page_idx: new entry}."""
+        duplicate_of, registered = {}, {}
+        if index is None:
+            return duplicate_of, registered
+        for idx, img_bytes in enumerate(images_to_process):
+            try:
+                fingerprint = dedup.page_fingerprint(img_bytes)
+            except Exception as e:
+                log.warning(f"Page {idx+1}: perceptual hash failed ({e}). Page will be uploaded.")
+                continue
+            match = index.find(fingerprint, scope)
+            # A still-pending entry from another concurrent job can't be waited on: upload instead
+            if match is not None and (match.payload is not None or match.job_id == job_id):
+                duplicate_of[idx] = match
+            else:
+                registered[idx] = index.add(fingerprint, scope, job_id, idx)
+        return duplicate_of, registered
+
+    def _extract_document(self, file_path, mime_type, extract_tables_only, progress_callback, row_callback=None, dedup_index=None, job_id=None, stats_callback=None):
         log.info(f"Initiating AI extraction for document: {file_path} ({mime_type})")
         
         images_to_process = []
@@ -51,83 +454,103 @@ class AIExtractor:
             with open(file_path, "rb") as f:
                 images_to_process.append(f.read())
 
-        all_pages_data = []
-        master_filename = "AI_Extracted_Report"
-        
-        active_prompt = TABLES_ONLY_PROMPT if extract_tables_only else MASTER_PROMPT
-        full_prompt = f"{active_prompt}\n\nEXPECTED JSON SCHEMA:\n{SAMPLE_JSON}"
+        # Concurrent jobs share this extractor: everything run-scoped lives on `run`, never on self
+        run = ExtractionRun(self.model_tiers)
 
-        for idx, img_bytes in enumerate(images_to_process):
-            # 🚀 NEW: Ping the UI progress bar
-            if progress_callback:
-                progress_callback(idx, len(images_to_process))
-                
-            log.info(f"Sending Page {idx + 1} to {self.model_name}...")
-            document_part = types.Part.from_bytes(data=img_bytes, mime_type="image/jpeg")
+        scope = "tables_only" if extract_tables_only else "full"
+        full_prompt = STATIC_PROMPTS[scope]
+
+        total_pages = len(images_to_process)
+        all_pages_data = [None] * total_pages
+
+        index = None
+        if self.dedup_threshold is not None:
+            index = dedup_index if dedup_index is not None else dedup.PerceptualHashIndex(threshold=self.dedup_threshold)
+        duplicate_of, registered = self._find_duplicate_pages(images_to_process, index, scope, job_id)
+        reused_earlier = {idx: entry for idx, entry in duplicate_of.items() if entry.job_id != job_id}
+        for idx, entry in reused_earlier.items():
+            all_pages_data[idx] = dedup.PerceptualHashIndex.reuse(entry)
+        to_upload = [idx for idx in range(total_pages) if idx not in duplicate_of]
+        if duplicate_of:
+            log.info(f"Dedup: {len(duplicate_of)} of {total_pages} pages are near-duplicates and will not be uploaded.")
+
+        # 🚀 NEW: Ping the UI progress bar
+        if progress_callback:
+            progress_callback(0, total_pages)
 
+        # 🚀 Pages run concurrently, one worker per pooled key. The pool's per-key pacing replaces
+        # the old fixed 5-second sleep, so throughput scales with the number of keys.
+        workers = max(1, min(self.key_pool.size, len(to_upload)))
+        # Streamed row events are queued by the workers and replayed on this thread (UI callbacks aren't thread-safe)
+        events = queue.SimpleQueue() if (self.stream and row_callback) else None
+
+        def page_event_sink(idx):
+            return (lambda event: events.put((idx, event))) if events else None
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page") as executor:
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._extract_page_in_context, run, idx, images_to_process[idx], full_prompt, page_event_sink(idx)): idx
+                for idx in to_upload
+            }
+            completed = len(duplicate_of)
+            pending = set(futures)
             try:
-                response = self.client.models.generate_content(
-                    model=self.model_name,
-                    contents=[full_prompt, document_part],
-                    config=types.GenerateContentConfig(
-                        response_mime_type="application/json",
-                        temperature=0.1,
-                        max_output_tokens=8192
-                    )
-                )
-
-                raw_output = response.text
-                
-                # 🚀 FIX 2: Catch NoneType timeouts from the API before cleaning
-                if not raw_output:
-                    raise ValueError(f"Page {idx+1}: AI returned a blank response. This is usually caused by API rate limits or server timeouts.")
+                while pending:
+                    done, pending = wait(pending, timeout=0.25 if events else None, return_when=FIRST_COMPLETED)
+                    _drain_events(events, row_callback)
+                    for future in done:
+                        idx = futures[future]
+                        try:
+                            all_pages_data[idx] = future.result()
+                            if idx in registered:
+                                registered[idx].payload = all_pages_data[idx]
+                        except json.JSONDecodeError as e:
+                            log.error(f"Failed to parse Gemini output on page {idx+1}: {e}")
+                            raise ValueError(f"The AI returned invalid JSON format on Page {idx+1}. Try again.")
+                        except Exception as e:
+                            log.error(f"Gemini API Error on page {idx+1}: {str(e)}")
+                            raise RuntimeError(str(e))
 
-                clean_json_string = self._clean_json_response(raw_output)
-                #parsed_data = json_repair.loads(clean_json_string)
-
-                # 🚀 FIX 1: Use json_repair to auto-fix missing quotes or trailing commas
-                try:
-                    parsed_data = json_repair.loads(clean_json_string)
-                except Exception as parse_error:
-                    log.error(f"Page {idx+1} JSON Repair Failed: {parse_error}")
-                    # 🚀 FIX 2: Graceful Degradation (Don't crash the whole PDF)
-                    parsed_data = {
-                        "tables": [{"headers": [{"column_name": "Error"}], "rows": [[f"Failed to parse page {idx+1}. AI generated invalid structure."]]}]
-                    }
-
-                if "document" not in parsed_data:
-                    log.warning(f"Page {idx+1}: AI missed the 'document' wrapper. Auto-healing...")
-                    valid_root_keys = ["tables", "main_title", "subtitles", "footer"]
-                    if any(key in parsed_data for key in valid_root_keys):
-                        filename = parsed_data.pop("recommended_filename", f"Extracted_Page_{idx+1}")
-                        parsed_data = {"recommended_filename": filename, "document": parsed_data}
-                    else:
-                        parsed_data = {"document": {"tables": []}}
-                        #raise ValueError(f"Page {idx+1}: AI returned unreadable structure. Keys found: {list(parsed_data.keys())}")
-
-                if idx == 0 and "recommended_filename" in parsed_data:
-                    master_filename = parsed_data["recommended_filename"]
-
-                all_pages_data.append(parsed_data)
-
-                # 🚀 NEW: The Free-Tier Smart Throttler
-                # If there are more pages left, pause for 5 seconds to avoid API Rate Limits
-                if idx < len(images_to_process) - 1:
-                    log.info("Free tier rate limit pacing: Waiting 5 seconds before next page...")
-                    if progress_callback:
-                        progress_callback(idx, len(images_to_process))
-                    time.sleep(5)
-
-            except json.JSONDecodeError as e:
-                log.error(f"Failed to parse Gemini output on page {idx+1}: {e}")
-                raise ValueError(f"The AI returned invalid JSON format on Page {idx+1}. Try again.")
-            except Exception as e:
-                log.error(f"Gemini API Error on page {idx+1}: {str(e)}")
-                raise RuntimeError(str(e))
+                        completed += 1
+                        if progress_callback and completed < total_pages:
+                            progress_callback(completed, total_pages)
+            except BaseException:
+                # Don't keep spending quota on a document that has already failed
+                for future in futures:
+                    future.cancel()
+                if index is not None:
+                    index.discard_job(job_id)
+                raise
+
+        # Duplicates inside this document copy their original once it has been extracted
+        for idx, entry in duplicate_of.items():
+            if idx not in reused_earlier:
+                all_pages_data[idx] = dedup.PerceptualHashIndex.reuse(entry)
+
+        master_filename = "AI_Extracted_Report"
+        if all_pages_data and "recommended_filename" in all_pages_data[0]:
+            master_filename = all_pages_data[0]["recommended_filename"]
+
+        stats = {"routing": run.router.report(), "keys": self.key_pool.report(), "tiling": dict(run.tiled_pages)}
+        if self.prompt_cache:
+            stats["prompt_cache"] = self.prompt_cache.report()
+        if index is not None:
+            index.record_run(total_pages, len(duplicate_of), len(reused_earlier))
+            stats["dedup"] = {
+                "pages": total_pages,
+                "uploaded": len(to_upload),
+                "duplicates": {idx + 1: (entry.page + 1 if entry.job_id == job_id else f"earlier document, page {entry.page + 1}") for idx, entry in sorted(duplicate_of.items())},
+                "batch": dict(index.stats),
+            }
+        if self.hedger:
+            # Cumulative for this extractor: the latency window and hedge budget span jobs by design
+            stats["hedging"] = self.hedger.report()
+            log.info(f"Hedging stats: {stats['hedging']}")
+        log.info(f"Successfully extracted and parsed all pages. Routing: {_routing_summary(stats)}")
+        if stats_callback:
+            stats_callback(stats)
 
-        log.info("Successfully extracted and parsed all pages.")
-        
         return {
             "recommended_filename": master_filename,
             "pages": all_pages_data
-        }
\ No newline at end of file
+        }
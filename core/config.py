@@ -50,4 +50,22 @@ SAMPLE_JSON = """{
     ],
     "footer": {"text": "", "is_bold": false, "font_size": 11}
   }
-}"""
\ No newline at end of file
+}"""
+
+# 🚀 Sent (after the original prompt and page image) when a streamed answer hits the output token cap mid-table
+CONTINUATION_PROMPT = """**Continuation Request:** Your previous answer for this page was cut off by the output length limit.
+
+The last COMPLETE row you returned for table number {table_number} was:
+{last_row}
+
+Return ONLY the data that comes AFTER that row, as a raw JSON object of the form {{"tables": [...], "footer": {{...}}}}:
+1. The first table must contain the remaining rows of that same table (repeat its exact headers).
+2. Then add any later tables and the footer, using the same schema as before.
+3. Do NOT repeat any row you already returned."""
+
+
+# 🚀 Appended to the prompt for each horizontal slice of a dense page (see core/tiling.py)
+TILE_PROMPT_NOTE = """**Tile Note:** This image is slice {tile_number} of {tile_count} of ONE tall page that was cut between table rows.
+1. Extract only what is visible in this slice. Do not invent rows that are cut off.
+2. Slices after the first start with a repeated copy of the table's header row: use it as the `headers` (exact same column names) and do NOT output it as a data row.
+3. Only the first slice contains the page title and only the last slice contains the footer. Leave them empty otherwise."""
@@ -0,0 +1,146 @@
+import copy
+import hashlib
+import io
+import threading
+import zlib
+from collections import deque
+from core.lazy import LazyModule
+
+np = LazyModule("numpy")
+Image = LazyModule("PIL.Image")
+
+# 16x16 difference hash = 256 bits: only a cheap candidate filter. Pages of the same printed register
+# holding different values land within a few bits of each other, so a hash match alone is never trusted
+HASH_SIZE = 16
+DEFAULT_THRESHOLD = 10
+
+# Content check for hash candidates: both pages are compared as 512 px wide grayscale images in
+# 4x4 blocks. One changed digit in 7pt text moves some block by 20+ grey levels; a WhatsApp-style
+# recompression or rescale of the same page stays around 5-12
+SIGNATURE_WIDTH = 512
+SIGNATURE_BLOCK = 4
+MAX_BLOCK_DIFF = 12
+MAX_ASPECT_DRIFT = 0.02
+
+
+def _dhash(gray, hash_size=HASH_SIZE):
+    """Difference hash of a grayscale image: each bit says whether a pixel is brighter than its right neighbour."""
+    small = gray.resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class PageFingerprint:
+    """Everything the index needs about one page: dHash, exact pixel digest and a compressed content signature."""
+
+    def __init__(self, phash, digest, aspect, signature_shape, signature):
+        self.phash = phash
+        self.digest = digest
+        self.aspect = aspect
+        self.signature_shape = signature_shape
+        self.signature = signature
+
+    def pixels(self):
+        return np.frombuffer(zlib.decompress(self.signature), dtype=np.uint8).reshape(self.signature_shape)
+
+
+def page_fingerprint(img_bytes):
+    with Image.open(io.BytesIO(img_bytes)) as img:
+        gray = img.convert("L")
+    digest = hashlib.sha256(f"{gray.size}".encode() + gray.tobytes()).hexdigest()
+    height = max(1, round(gray.height * SIGNATURE_WIDTH / gray.width))
+    small = np.asarray(gray.resize((SIGNATURE_WIDTH, height), Image.BILINEAR), dtype=np.uint8)
+    return PageFingerprint(_dhash(gray), digest, gray.height / gray.width, small.shape, zlib.compress(small.tobytes(), 1))
+
+
+def same_content(a, b, max_block_diff=MAX_BLOCK_DIFF, block=SIGNATURE_BLOCK):
+    """True when no small block of the two pages differs by more than `max_block_diff` grey levels on average."""
+    if abs(a.aspect - b.aspect) > MAX_ASPECT_DRIFT * a.aspect:
+        return False
+    pixels_a, pixels_b = a.pixels(), b.pixels()
+    rows = min(pixels_a.shape[0], pixels_b.shape[0]) // block * block
+    cols = SIGNATURE_WIDTH // block * block
+    diff = np.abs(pixels_a[:rows, :cols].astype(np.int16) - pixels_b[:rows, :cols].astype(np.int16))
+    block_means = diff.reshape(rows // block, block, cols // block, block).mean(axis=(1, 3))
+    return float(block_means.max()) <= max_block_diff
+
+
+class HashEntry:
+    def __init__(self, fingerprint, scope, job_id, page):
+        self.fingerprint = fingerprint
+        self.scope = scope
+        self.job_id = job_id
+        self.page = page
+        self.payload = None
+
+
+class PerceptualHashIndex:
+    """Near-duplicate lookup over page images for one batch (one user session, never shared across users).
+
+    A page is only reused when its decoded pixels are identical to an earlier page, or when its
+    dHash is close *and* the block-wise content check confirms it. Entries are scoped (e.g. by
+    extraction mode) so a "tables only" result is never reused for a full-layout request. An
+    entry is registered before its page is uploaded and gets its payload once extraction
+    finishes, so duplicates inside the same document can wait for the original.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_entries=100):
+        self.threshold = threshold
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self.stats = {"pages": 0, "duplicates": 0, "reused_across_documents": 0, "rejected_by_content_check": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def find(self, fingerprint, scope):
+        """Matching entry (exact pixels first, then confirmed near-duplicates by hash distance), or None."""
+        with self._lock:
+            entries = [entry for entry in self._entries if entry.scope == scope]
+        for entry in entries:
+            if entry.fingerprint.digest == fingerprint.digest:
+                return entry
+
+        candidates = []
+        for entry in entries:
+            distance = hamming(fingerprint.phash, entry.fingerprint.phash)
+            if distance <= self.threshold:
+                candidates.append((distance, entry))
+        for _, entry in sorted(candidates, key=lambda candidate: candidate[0]):
+            if same_content(fingerprint, entry.fingerprint):
+                return entry
+            with self._lock:
+                self.stats["rejected_by_content_check"] += 1
+        return None
+
+    def add(self, fingerprint, scope, job_id, page):
+        entry = HashEntry(fingerprint, scope, job_id, page)
+        with self._lock:
+            self._entries.append(entry)
+        return entry
+
+    def discard_job(self, job_id):
+        """Drops entries of a job that failed before their payloads were filled in."""
+        with self._lock:
+            kept = [entry for entry in self._entries if entry.job_id != job_id or entry.payload is not None]
+            self._entries.clear()
+            self._entries.extend(kept)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def record_run(self, pages, duplicates, reused_across_documents):
+        with self._lock:
+            self.stats["pages"] += pages
+            self.stats["duplicates"] += duplicates
+            self.stats["reused_across_documents"] += reused_across_documents
+
+    @staticmethod
+    def reuse(entry):
+        return copy.deepcopy(entry.payload)
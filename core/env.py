@@ -0,0 +1,36 @@
+import os
+import threading
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+
+def find_env_file(start=None):
+    """Nearest `.env` in the working directory or one of its parents, or None."""
+    directory = os.path.abspath(start or os.getcwd())
+    while True:
+        candidate = os.path.join(directory, ".env")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def load_env_once():
+    """Loads `.env` into os.environ once per process, before the first setting is read.
+
+    Every module that reads settings calls this first (the logger does at import). python-dotenv
+    is only imported when there is a file to load, so a plain environment keeps cold start lean.
+    Variables already set in the environment win over the file.
+    """
+    global _env_loaded
+    with _env_lock:
+        if _env_loaded:
+            return
+        _env_loaded = True
+        env_file = find_env_file()
+        if env_file:
+            from dotenv import load_dotenv
+            load_dotenv(env_file)
@@ -1,13 +1,175 @@
 import json
 import os
+import threading
+from copy import copy
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 from openpyxl.utils import get_column_letter
+from core.env import load_env_once
 from core.logger import log
 from core.font_converter import unicode_to_krutidev
 
+# Documents with at least this many pages render their sheets in a process pool
+PARALLEL_MIN_PAGES = 20
+# Layout is short CPU work next to Streamlit and the extractor threads: a few processes are plenty
+MAX_RENDER_WORKERS = 4
+
+_render_pool = None
+_render_pool_workers = 0
+_render_pool_lock = threading.Lock()
+
+
+def default_render_workers():
+    """CPUs this process may actually run on (affinity / cpuset, not the host's count), capped at MAX_RENDER_WORKERS."""
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        # macOS and Windows have no affinity API
+        available = os.cpu_count() or 1
+    return max(1, min(available, MAX_RENDER_WORKERS))
+
+
+def _shared_render_pool(workers):
+    """One process pool reused by every build; replaced only when a build asks for more workers."""
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        if _render_pool is None or workers > _render_pool_workers:
+            if _render_pool is not None:
+                # Builds still mapping on the old pool finish their work before it winds down
+                _render_pool.shutdown(wait=False)
+            _render_pool = ProcessPoolExecutor(max_workers=workers)
+            _render_pool_workers = workers
+        return _render_pool
+
+
+def _discard_render_pool(pool):
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool, _render_pool_workers = None, 0
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _legacy_text(text, use_legacy_font):
+    if use_legacy_font and isinstance(text, str):
+        return unicode_to_krutidev(text)
+    return text
+
+
+def column_widths(cells, merged_cells):
+    """Autofit widths per column: longest line of any non-merged cell + 4, clamped to 12..45."""
+    max_lengths = {}
+    for row, col, value, _ in cells:
+        if (row, col) in merged_cells or not value:
+            continue
+        longest_line = max(len(line) for line in str(value).split('\n'))
+        max_lengths[col] = max(max_lengths.get(col, 0), longest_line)
+    last_col = max([col for _, col in merged_cells] + [col for _, col, _, _ in cells] + [1])
+    return {col: max(12, min(max_lengths.get(col, 0) + 4, 45)) for col in range(1, last_col + 1)}
+
+
+class SheetSpec:
+    """Compact, picklable description of one worksheet: what a render worker hands back to the writer.
+
+    cells are (row, col, value, style) tuples where style is (kind, font_size, is_bold, align) and
+    kind is "text" (merged title/footer lines), "header" or "cell". merges are (row, last_col) spans
+    starting at column 1.
+    """
+
+    def __init__(self, max_cols):
+        self.max_cols = max_cols
+        self.cells = []
+        self.merges = []
+        self.row_heights = {}
+        self.column_widths = {}
+
+
+def max_columns(document):
+    max_cols = 1
+    for table in document.get("tables", []):
+        if "headers" in table:
+            max_cols = max(max_cols, len(table["headers"]))
+    return max_cols
+
+
+def render_sheet(document, use_legacy_font=False):
+    """Lays out one page (layout, legacy text conversion, row heights, column widths) without touching openpyxl."""
+    max_cols = max_columns(document)
+    spec = SheetSpec(max_cols)
+    current_row = 1
+
+    def merged_text(text, is_bold, font_size, align):
+        nonlocal current_row
+        if not text:
+            return
+        processed_text = _legacy_text(text, use_legacy_font)
+        spec.cells.append((current_row, 1, processed_text, ("text", font_size, is_bold, align)))
+        spec.merges.append((current_row, max_cols))
+        chars_per_line = max(max_cols * 15, 30)
+        estimated_lines = str(processed_text).count('\n') + (len(str(processed_text)) // chars_per_line) + 1
+        spec.row_heights[current_row] = estimated_lines * (font_size * 1.5)
+        current_row += 1
+
+    # 🚀 DEFENSIVE MAIN TITLE
+    main_title = document.get("main_title", {})
+    if isinstance(main_title, str):
+        main_title = {"text": main_title, "is_bold": True, "font_size": 14}
+    merged_text(main_title.get("text", ""), main_title.get("is_bold", True), main_title.get("font_size", 14), "center")
+
+    # 🚀 DEFENSIVE SUBTITLES
+    subtitles = document.get("subtitles", [])
+    if isinstance(subtitles, str):
+        subtitles = [{"text": subtitles, "is_bold": True, "font_size": 12}]
+    elif isinstance(subtitles, dict):
+        subtitles = [subtitles]
+
+    for subtitle in subtitles:
+        if isinstance(subtitle, str):
+            subtitle = {"text": subtitle, "is_bold": True, "font_size": 12}
+        merged_text(subtitle.get("text", ""), subtitle.get("is_bold", True), subtitle.get("font_size", 12), "center")
+
+    current_row += 1
+
+    for table in document.get("tables", []):
+        table_title = table.get("table_title", "")
+        if table_title:
+            merged_text(table_title, True, 12, "left")
+
+        for col_idx, header in enumerate(table.get("headers", []), start=1):
+            header_text = _legacy_text(header.get("column_name", ""), use_legacy_font)
+            spec.cells.append((current_row, col_idx, header_text, ("header", 11, header.get("is_bold", True), "center")))
+        current_row += 1
+
+        for row_data in table.get("rows", []):
+            max_lines_in_row = 1
+            for col_idx, value in enumerate(row_data, start=1):
+                spec.cells.append((current_row, col_idx, _legacy_text(str(value), use_legacy_font), ("cell", 11, False, "center")))
+                lines = str(value).count('\n') + (len(str(value)) // 30) + 1
+                if lines > max_lines_in_row:
+                    max_lines_in_row = lines
+            spec.row_heights[current_row] = max_lines_in_row * 16
+            current_row += 1
+
+        current_row += 1
+
+    footer = document.get("footer", {})
+    if isinstance(footer, list):
+        footer_text = "\n".join([str(i) for i in footer])
+        footer = {"text": footer_text, "is_bold": False, "font_size": 11}
+    elif isinstance(footer, str):
+        footer = {"text": footer, "is_bold": False, "font_size": 11}
+    merged_text(footer.get("text", ""), footer.get("is_bold", False), footer.get("font_size", 11), "left")
+
+    merged_cells = {(row, col) for row, last_col in spec.merges for col in range(1, last_col + 1)}
+    spec.column_widths = column_widths(spec.cells, merged_cells)
+    return spec
+
+
 class ExcelBuilder:
-    def __init__(self, json_path, output_path="output_report.xlsx", use_legacy_font=False, legacy_font_name="Kruti Dev 010"):
+    def __init__(self, json_path, output_path="output_report.xlsx", use_legacy_font=False, legacy_font_name="Kruti Dev 010",
+                 render_workers=None, parallel_min_pages=None):
         self.json_path = json_path
         self.output_path = output_path
         self.use_legacy_font = use_legacy_font
@@ -15,7 +177,6 @@ class ExcelBuilder:
         self.wb = Workbook()
         # Initialize the first sheet (we will name it dynamically in build())
         self.ws = self.wb.active 
-        self.current_row = 1
         
         self.thin_border = Border(
             left=Side(style='thin'), right=Side(style='thin'),
@@ -24,6 +185,16 @@ class ExcelBuilder:
         self.header_fill = PatternFill(start_color="EAEAEA", end_color="EAEAEA", fill_type="solid")
         self.center_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
         self.left_align = Alignment(horizontal='left', vertical='center', wrap_text=True)
+        self._style_cache = {}
+        self._style_arrays = {}
+
+        load_env_once()
+        if render_workers is None:
+            render_workers = int(os.environ.get("EXCEL_RENDER_WORKERS", 0)) or default_render_workers()
+        if parallel_min_pages is None:
+            parallel_min_pages = int(os.environ.get("EXCEL_PARALLEL_MIN_PAGES", PARALLEL_MIN_PAGES))
+        self.render_workers = render_workers
+        self.parallel_min_pages = parallel_min_pages
 
     def _get_font(self, size, is_bold):
         if self.use_legacy_font:
@@ -31,9 +202,7 @@ class ExcelBuilder:
         return Font(name="Nirmala UI", size=size, bold=is_bold)
 
     def _process_text(self, text):
-        if self.use_legacy_font and isinstance(text, str):
-            return unicode_to_krutidev(text)
-        return text
+        return _legacy_text(text, self.use_legacy_font)
 
     def load_data(self):
         if not os.path.exists(self.json_path):
@@ -49,55 +218,62 @@ class ExcelBuilder:
         return []
 
     def get_max_columns(self, document):
-        max_cols = 1
-        for table in document.get("tables", []):
-            if "headers" in table:
-                max_cols = max(max_cols, len(table["headers"]))
-        return max_cols
+        return max_columns(document)
 
-    def write_merged_text(self, text, max_cols, is_bold, font_size, alignment):
-        if not text:
-            return
-        
-        processed_text = self._process_text(text)
-        cell = self.ws.cell(row=self.current_row, column=1, value=processed_text)
-        self.ws.merge_cells(start_row=self.current_row, start_column=1, end_row=self.current_row, end_column=max_cols)
-        
-        cell.font = self._get_font(size=font_size, is_bold=is_bold)
-        cell.alignment = alignment
-        
-        chars_per_line = max(max_cols * 15, 30) 
-        estimated_lines = str(processed_text).count('\n') + (len(str(processed_text)) // chars_per_line) + 1
-        self.ws.row_dimensions[self.current_row].height = estimated_lines * (font_size * 1.5)
-        self.current_row += 1
-
-    def _autofit_columns(self):
-        merged_cells_map = set()
-        for merged_range in self.ws.merged_cells.ranges:
-            for row in range(merged_range.min_row, merged_range.max_row + 1):
-                for col in range(merged_range.min_col, merged_range.max_col + 1):
-                    merged_cells_map.add((row, col))
-
-        max_col_idx = self.ws.max_column
-        max_row_idx = self.ws.max_row
-        
-        for col_idx in range(1, max_col_idx + 1):
-            column_letter = get_column_letter(col_idx)
-            max_length = 0
-            
-            for row_idx in range(1, max_row_idx + 1):
-                if (row_idx, col_idx) in merged_cells_map:
-                    continue
-                
-                cell = self.ws.cell(row=row_idx, column=col_idx)
-                if cell.value:
-                    lines = str(cell.value).split('\n')
-                    longest_line = max([len(line) for line in lines])
-                    if longest_line > max_length:
-                        max_length = longest_line
-            
-            adjusted_width = max(12, min(max_length + 4, 45))
-            self.ws.column_dimensions[column_letter].width = adjusted_width
+    def render_sheets(self, pages_data):
+        """SheetSpecs for every page, in page order; large documents fan out across a process pool."""
+        if len(pages_data) >= self.parallel_min_pages and self.render_workers > 1:
+            workers = min(self.render_workers, len(pages_data))
+            chunksize = max(1, len(pages_data) // (workers * 4))
+            pool = None
+            try:
+                pool = _shared_render_pool(workers)
+                return list(pool.map(render_sheet, pages_data, repeat(self.use_legacy_font), chunksize=chunksize))
+            except Exception as e:
+                # Sandboxes without fork/semaphores, pickling surprises...: the serial path gives the same workbook
+                log.warning(f"Parallel sheet rendering failed ({e}). Rendering pages one by one.")
+                if pool is not None:
+                    # A broken pool would fail every later build too; the next one starts a fresh pool
+                    _discard_render_pool(pool)
+        return [render_sheet(document, self.use_legacy_font) for document in pages_data]
+
+    def _cell_style(self, style):
+        cached = self._style_cache.get(style)
+        if cached is None:
+            kind, font_size, is_bold, align = style
+            cached = (
+                self._get_font(size=font_size, is_bold=is_bold),
+                self.center_align if align == "center" else self.left_align,
+                self.thin_border if kind != "text" else None,
+                self.header_fill if kind == "header" else None,
+            )
+            self._style_cache[style] = cached
+        return cached
+
+    def _write_sheet(self, spec):
+        """Single writer: turns one SheetSpec into cells, merges and dimensions on self.ws."""
+        for row, col, value, style in spec.cells:
+            cell = self.ws.cell(row=row, column=col, value=value)
+            style_array = self._style_arrays.get(style)
+            if style_array is not None:
+                # Registering Font/Alignment/Border objects per cell dominates large builds: copy the
+                # workbook's style indices from the first cell that used this style instead
+                cell._style = copy(style_array)
+                continue
+            font, alignment, border, fill = self._cell_style(style)
+            cell.font = font
+            cell.alignment = alignment
+            if border is not None:
+                cell.border = border
+            if fill is not None:
+                cell.fill = fill
+            self._style_arrays[style] = copy(cell._style)
+        for row, last_col in spec.merges:
+            self.ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=last_col)
+        for row, height in spec.row_heights.items():
+            self.ws.row_dimensions[row].height = height
+        for col, width in spec.column_widths.items():
+            self.ws.column_dimensions[get_column_letter(col)].width = width
 
     def build(self):
         log.info("🚀 Booting Smart Excel Builder...")
@@ -107,100 +283,17 @@ class ExcelBuilder:
             log.error("❌ Invalid JSON format or empty document.")
             return
 
-        # 🚀 Dynamic Tab Loop Engine
-        for page_idx, document in enumerate(pages_data):
-            
-            # Setup Worksheet Tab
+        # 🚀 Layout, text conversion and autofit run per page (in parallel for big documents)...
+        sheet_specs = self.render_sheets(pages_data)
+
+        # ...and one writer assembles the tabs in page order
+        for page_idx, spec in enumerate(sheet_specs):
             if page_idx == 0:
                 self.ws = self.wb.active
                 self.ws.title = "Page 1"
             else:
                 self.ws = self.wb.create_sheet(title=f"Page {page_idx + 1}")
-                
-            self.current_row = 1 # Reset Row count for the new page
-            
-            # --- RENDER THE PAGE ---
-            max_cols = self.get_max_columns(document)
-            
-            # 🚀 DEFENSIVE MAIN TITLE
-            main_title = document.get("main_title", {})
-            if isinstance(main_title, str):
-                main_title = {"text": main_title, "is_bold": True, "font_size": 14}
-                
-            self.write_merged_text(
-                main_title.get("text", ""), max_cols, 
-                main_title.get("is_bold", True), main_title.get("font_size", 14), 
-                self.center_align
-            )
-
-            # 🚀 DEFENSIVE SUBTITLES
-            subtitles = document.get("subtitles", [])
-            if isinstance(subtitles, str):
-                subtitles = [{"text": subtitles, "is_bold": True, "font_size": 12}]
-            elif isinstance(subtitles, dict):
-                subtitles = [subtitles]
-
-            for subtitle in subtitles:
-                if isinstance(subtitle, str):
-                    subtitle = {"text": subtitle, "is_bold": True, "font_size": 12}
-                    
-                self.write_merged_text(
-                    subtitle.get("text", ""), max_cols, 
-                    subtitle.get("is_bold", True), subtitle.get("font_size", 12), 
-                    self.center_align
-                )
-                
-            self.current_row += 1 
-
-            for table in document.get("tables", []):
-                table_title = table.get("table_title", "")
-                if table_title:
-                    self.write_merged_text(table_title, max_cols, True, 12, self.left_align)
-
-                headers = table.get("headers", [])
-                for col_idx, header in enumerate(headers, start=1):
-                    header_text = header.get("column_name", "")
-                    cell = self.ws.cell(row=self.current_row, column=col_idx, value=self._process_text(header_text))
-                    
-                    cell.font = self._get_font(size=11, is_bold=header.get("is_bold", True))
-                    cell.alignment = self.center_align
-                    cell.border = self.thin_border
-                    cell.fill = self.header_fill
-                self.current_row += 1
-
-                for row_data in table.get("rows", []):
-                    max_lines_in_row = 1
-                    for col_idx, value in enumerate(row_data, start=1):
-                        cell = self.ws.cell(row=self.current_row, column=col_idx, value=self._process_text(str(value)))
-                        
-                        cell.font = self._get_font(size=11, is_bold=False)
-                        cell.alignment = self.center_align
-                        cell.border = self.thin_border
-                        
-                        lines = str(value).count('\n') + (len(str(value)) // 30) + 1
-                        if lines > max_lines_in_row:
-                            max_lines_in_row = lines
-                            
-                    self.ws.row_dimensions[self.current_row].height = max_lines_in_row * 16
-                    self.current_row += 1
-                    
-                self.current_row += 1 
-
-            footer = document.get("footer", {})
-            if isinstance(footer, list):
-                footer_text = "\n".join([str(i) for i in footer])
-                footer = {"text": footer_text, "is_bold": False, "font_size": 11}
-            elif isinstance(footer, str):
-                footer = {"text": footer, "is_bold": False, "font_size": 11}
-                
-            self.write_merged_text(
-                footer.get("text", ""), max_cols, 
-                footer.get("is_bold", False), footer.get("font_size", 11), 
-                self.left_align
-            )
-
-            # Autofit must happen per page BEFORE moving to the next tab!
-            self._autofit_columns()
+            self._write_sheet(spec)
 
         self.wb.save(self.output_path)
-        log.info(f"✅ Success! Smart Multi-Page Report saved to: {self.output_path}")
\ No newline at end of file
+        log.info(f"✅ Success! Smart Multi-Page Report saved to: {self.output_path}")
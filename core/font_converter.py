@@ -1,5 +1,77 @@
 import re
 
+CONSONANTS = r'[\u0915-\u0939\u0958-\u095F]'
+HALANT = r'\u094D'
+CHHOTI_EE = r'\u093F'
+REPH = r'\u0930\u094D'
+MATRAS = r'[\u093E-\u094C\u0962\u0963]'
+ANUSVARA = r'[\u0901\u0902]'
+
+# STRICTLY ORDERED REPLACEMENTS (Unicode -> Kruti Dev), shared with the reverse converter
+UNICODE_TO_KRUTIDEV = [
+    # Rogue English Quotes
+    ("\"", ""), ("'", ""),
+
+    # Brackets
+    ("(", "¼"), (")", "½"), ("[", "¼"), ("]", "½"), ("{", "¼"), ("}", "½"),
+    ("‘", "^"), ("’", "*"), ("“", "Þ"), ("”", "ß"),
+    
+    # 🚀 THE FONT FALLBACK HACK FOR PUNCTUATION 🚀
+    # Replaces standard '.' and '/' with identical mathematical symbols.
+    # This forces Excel to safely fallback to Arial to draw them!
+    (".", "\u2024"),   # Replaced with One Dot Leader
+    ("॰", "\u2024"),   # Replaced Devanagari abbreviation dot
+    ("/", "\u2215"),   # Replaced with Mathematical Division Slash
+    
+    ("।", "A"), 
+    (":", "%"), 
+    ("-", "-"),
+    
+    ("०", "0"), ("१", "1"), ("२", "2"), ("३", "3"), ("४", "4"),
+    ("५", "5"), ("६", "6"), ("७", "7"), ("८", "8"), ("९", "9"),
+
+    # Special Conjuncts
+    ("क्ष्", "{"), ("त्र्", "«"), ("ज्ञ्", "K~"), ("श्र्", "J~"),
+    ("क्ष", "{k"), ("त्र", "«k"), ("ज्ञ", "K"), ("श्र", "J"),
+    ("क्र", "Ø"), ("ट्र", "Vª"), ("ड्र", "Mª"),
+    ("द्व", "}"), ("द्य", "|"), ("द्ध", ")"), 
+    ("ट्ट", "V~V"), ("ड्ड", "M~M"), ("दृ", "n`"), ("कृ", "d`"),
+
+    # R-Modifiers
+    ("र्", "Z"),  # Top R (Reph)
+    ("्र", "z"),  # Bottom R (Paden Ra)
+
+    # Explicit Half Consonants
+    ("क्", "D"), ("ख्", "["), ("ग्", "X"), ("घ्", "?"), ("ङ्", "³~"),
+    ("च्", "P"), ("छ्", "N~"), ("ज्", "T"), ("झ्", ">~"), ("ञ्", "¥~"),
+    ("ट्", "V~"), ("ठ्", "B~"), ("ड्", "M~"), ("ढ्", "<~"), ("ण्", "."),
+    ("त्", "R"), ("थ्", "F"), ("द्", "n~"), ("ध्", "è"), ("न्", "U"),
+    ("प्", "I"), ("फ्", "¶"), ("ब्", "C"), ("भ्", "H"), ("म्", "E"),
+    ("य्", "¸"), ("ल्", "Y"), ("व्", "O"), ("श्", "\""),
+    ("ष्", "'"), ("स्", "L"), ("ह्", "g~"),
+
+    # Full Consonants
+    ("क", "d"), ("ख", "[k"), ("ग", "x"), ("घ", "?k"), ("ङ", "³"),
+    ("च", "p"), ("छ", "N"), ("ज", "t"), ("झ", ">"), ("ञ", "¥"),
+    ("ट", "V"), ("ठ", "B"), ("ड", "M"), ("ढ", "<"), ("ण", ".k"),
+    ("त", "r"), ("थ", "Fk"), ("द", "n"), ("ध", "èk"), ("न", "u"),
+    ("प", "i"), ("फ", "Q"), ("ब", "c"), ("भ", "Hk"), ("म", "e"),
+    ("य", ";"), ("र", "j"), ("ल", "y"), ("व", "o"), ("श", "”k"),
+    ("ष", "'k"), ("स", "l"), ("ह", "g"),
+
+    # Vowels
+    ("अ", "v"), ("आ", "vk"), ("इ", "b"), ("ई", "bZ"), ("उ", "m"), ("ऊ", "Å"),
+    ("ए", ","), ("ऐ", ",S"), ("ओ", "vks"), ("औ", "vkS"), ("ऋ", "Fk"),
+    ("ऑ", "vkW"), ("ऍ", "vW"),
+
+    # Matras & Modifiers
+    ("ॉ", "kW"), ("ॅ", "W"), ("ा", "k"), ("ि", "f"), ("ी", "h"), 
+    ("ु", "q"), ("ू", "w"), ("ृ", "`"), ("े", "s"), ("ै", "S"), 
+    ("ो", "ks"), ("ौ", "kS"), ("ं", "a"), ("ँ", "¡"), ("ः", "%"),
+    ("़", "+"), ("्", "~") # Catch-all Halant
+]
+
+
 def unicode_to_krutidev(text):
     if not text:
         return ""
@@ -13,86 +85,72 @@ def unicode_to_krutidev(text):
     # for bad_word, good_word in spell_fixes:
     #     text = text.replace(bad_word, good_word)
 
-    consonants = r'[\u0915-\u0939\u0958-\u095F]'
-    halant = r'\u094D'
-    chhoti_ee = r'\u093F'
-    reph = r'\u0930\u094D'
-    matras = r'[\u093E-\u094C\u0962\u0963]'
-    anusvara = r'[\u0901\u0902]'
-
     # 1. REPH (Top R)
-    reph_pattern = f'({reph})({consonants}(?:{halant}{consonants})*)({matras}?{anusvara}?)'
+    reph_pattern = f'({REPH})({CONSONANTS}(?:{HALANT}{CONSONANTS})*)({MATRAS}?{ANUSVARA}?)'
     text = re.sub(reph_pattern, r'\2\3\1', text)
 
     # 2. CHHOTI EE
-    cluster_pattern = f'({consonants}(?:{halant}{consonants})*){chhoti_ee}'
+    cluster_pattern = f'({CONSONANTS}(?:{HALANT}{CONSONANTS})*){CHHOTI_EE}'
     text = re.sub(cluster_pattern, '\u093F\\1', text)
 
     # 3. STRICTLY ORDERED REPLACEMENTS
-    replacements = [
-        # Rogue English Quotes
-        ("\"", ""), ("'", ""),
-
-        # Brackets
-        ("(", "¼"), (")", "½"), ("[", "¼"), ("]", "½"), ("{", "¼"), ("}", "½"),
-        ("‘", "^"), ("’", "*"), ("“", "Þ"), ("”", "ß"),
-        
-        # 🚀 THE FONT FALLBACK HACK FOR PUNCTUATION 🚀
-        # Replaces standard '.' and '/' with identical mathematical symbols.
-        # This forces Excel to safely fallback to Arial to draw them!
-        (".", "\u2024"),   # Replaced with One Dot Leader
-        ("॰", "\u2024"),   # Replaced Devanagari abbreviation dot
-        ("/", "\u2215"),   # Replaced with Mathematical Division Slash
-        
-        ("।", "A"), 
-        (":", "%"), 
-        ("-", "-"),
-        
-        ("०", "0"), ("१", "1"), ("२", "2"), ("३", "3"), ("४", "4"),
-        ("५", "5"), ("६", "6"), ("७", "7"), ("८", "8"), ("९", "9"),
-
-        # Special Conjuncts
-        ("क्ष्", "{"), ("त्र्", "«"), ("ज्ञ्", "K~"), ("श्र्", "J~"),
-        ("क्ष", "{k"), ("त्र", "«k"), ("ज्ञ", "K"), ("श्र", "J"),
-        ("क्र", "Ø"), ("ट्र", "Vª"), ("ड्र", "Mª"),
-        ("द्व", "}"), ("द्य", "|"), ("द्ध", ")"), 
-        ("ट्ट", "V~V"), ("ड्ड", "M~M"), ("दृ", "n`"), ("कृ", "d`"),
-
-        # R-Modifiers
-        ("र्", "Z"),  # Top R (Reph)
-        ("्र", "z"),  # Bottom R (Paden Ra)
-
-        # Explicit Half Consonants
-        ("क्", "D"), ("ख्", "["), ("ग्", "X"), ("घ्", "?"), ("ङ्", "³~"),
-        ("च्", "P"), ("छ्", "N~"), ("ज्", "T"), ("झ्", ">~"), ("ञ्", "¥~"),
-        ("ट्", "V~"), ("ठ्", "B~"), ("ड्", "M~"), ("ढ्", "<~"), ("ण्", "."),
-        ("त्", "R"), ("थ्", "F"), ("द्", "n~"), ("ध्", "è"), ("न्", "U"),
-        ("प्", "I"), ("फ्", "¶"), ("ब्", "C"), ("भ्", "H"), ("म्", "E"),
-        ("य्", "¸"), ("ल्", "Y"), ("व्", "O"), ("श्", "\""),
-        ("ष्", "'"), ("स्", "L"), ("ह्", "g~"),
-
-        # Full Consonants
-        ("क", "d"), ("ख", "[k"), ("ग", "x"), ("घ", "?k"), ("ङ", "³"),
-        ("च", "p"), ("छ", "N"), ("ज", "t"), ("झ", ">"), ("ञ", "¥"),
-        ("ट", "V"), ("ठ", "B"), ("ड", "M"), ("ढ", "<"), ("ण", ".k"),
-        ("त", "r"), ("थ", "Fk"), ("द", "n"), ("ध", "èk"), ("न", "u"),
-        ("प", "i"), ("फ", "Q"), ("ब", "c"), ("भ", "Hk"), ("म", "e"),
-        ("य", ";"), ("र", "j"), ("ल", "y"), ("व", "o"), ("श", "”k"),
-        ("ष", "'k"), ("स", "l"), ("ह", "g"),
-
-        # Vowels
-        ("अ", "v"), ("आ", "vk"), ("इ", "b"), ("ई", "bZ"), ("उ", "m"), ("ऊ", "Å"),
-        ("ए", ","), ("ऐ", ",S"), ("ओ", "vks"), ("औ", "vkS"), ("ऋ", "Fk"),
-        ("ऑ", "vkW"), ("ऍ", "vW"),
-
-        # Matras & Modifiers
-        ("ॉ", "kW"), ("ॅ", "W"), ("ा", "k"), ("ि", "f"), ("ी", "h"), 
-        ("ु", "q"), ("ू", "w"), ("ृ", "`"), ("े", "s"), ("ै", "S"), 
-        ("ो", "ks"), ("ौ", "kS"), ("ं", "a"), ("ँ", "¡"), ("ः", "%"),
-        ("़", "+"), ("्", "~") # Catch-all Halant
-    ]
-
-    for unicode_char, krutidev_char in replacements:
+    for unicode_char, krutidev_char in UNICODE_TO_KRUTIDEV:
         text = text.replace(unicode_char, krutidev_char)
 
-    return text
\ No newline at end of file
+    return text
+
+
+# 🚀 REVERSE (Kruti Dev -> Unicode): the same table, compiled once into a single longest-match-first regex.
+# Where several Unicode characters share one glyph the first table entry wins, except for the cases below.
+_REPH_MARK = "\uE000"
+_CHHOTI_EE_MARK = "\uE001"
+_REVERSE_OVERRIDES = {
+    "Z": _REPH_MARK,            # reph glyph, moved back in front of its cluster below
+    "f": _CHHOTI_EE_MARK,       # chhoti ee glyph, moved back after its cluster below
+    # ASCII digits in a legacy cell are usually numbers typed in Latin digits; keep them as they are
+    **{digit: digit for digit in "0123456789"},
+    # Standard Kruti Dev 010 keys that hand-typed files use but unicode_to_krutidev never emits
+    "/k": "ध", "/": "ध्", "=": "त्र", "_": "ऋ",
+    # श / ष as the 010 keyboard types them. unicode_to_krutidev writes ष as 'k and श् as ", so its
+    # own ष / श् / ष् output does not survive a round trip; typed registers are what this map is for
+    "'k": "श", "'": "श्", '"k': "ष", '"': "ष्",
+    # Half letters closed by the aa stroke are the full consonant, not consonant + halant + aa
+    "Dk": "क", "Xk": "ग", "Pk": "च", "Tk": "ज", "Rk": "त", "Uk": "न", "Ik": "प",
+    "Ck": "ब", "Ek": "म", "Yk": "ल", "Ok": "व", "Lk": "स", "?k": "घ", "?": "घ्", "èk": "ध",
+    # Single-key conjuncts and vowels of the 010 layout
+    "Ùk": "त्त", "Ù": "त्त्", "ä": "क्त", "é": "न्न", "™": "न्न्", "ô": "क्क", "í": "द्द",
+    "ê": "ट्ट", "ë": "ट्ठ", "ì": "ड्ड", "ï": "ड्ढ", "ç": "प्र", "Á": "प्र", "Ý": "फ्र", "æ": "द्र",
+    "Ñ": "कृ", "—": "कृ", "–": "दृ", "â": "हृ", "à": "ह्न", "á": "ह्य", "ã": "ह्म", "º": "ह्",
+    "Ë": "ध्", "Ä": "घ", "G": "ळ", "#": "रु", ":": "रू", "È": "ीं", "‚": "ॉ", "v‚": "ऑ",
+    "Ã": "ई", "b±": "ईं", "•": "ऽ", "ñ": "॰",
+    "&": "-", "]": ",", "@": "/", "\\": "?", "¾": "=", "¿": "{", "À": "}",
+}
+
+def _build_reverse_map():
+    reverse = {}
+    for unicode_char, krutidev_char in UNICODE_TO_KRUTIDEV:
+        if krutidev_char:
+            reverse.setdefault(krutidev_char, unicode_char)
+    reverse.update(_REVERSE_OVERRIDES)
+    return reverse
+
+KRUTIDEV_TO_UNICODE = _build_reverse_map()
+_KRUTIDEV_GLYPHS = re.compile("|".join(re.escape(glyph) for glyph in sorted(KRUTIDEV_TO_UNICODE, key=len, reverse=True)))
+_CLUSTER = f'{CONSONANTS}\u093C?(?:{HALANT}{CONSONANTS}\u093C?)*'
+_CHHOTI_EE_REORDER = re.compile(f'{_CHHOTI_EE_MARK}({_CLUSTER})')
+_REPH_REORDER = re.compile(f'({_CLUSTER})({MATRAS}?{ANUSVARA}?){_REPH_MARK}')
+
+def krutidev_to_unicode(text):
+    if not text:
+        return ""
+
+    # 1. Glyphs -> Unicode characters (visual order)
+    text = _KRUTIDEV_GLYPHS.sub(lambda match: KRUTIDEV_TO_UNICODE[match.group(0)], text)
+
+    # 2. CHHOTI EE: typed before its cluster, stored after it
+    text = _CHHOTI_EE_REORDER.sub('\\1\u093F', text)
+    text = text.replace(_CHHOTI_EE_MARK, '\u093F')
+
+    # 3. REPH: typed after its cluster (and matra), stored before it
+    text = _REPH_REORDER.sub('\u0930\u094D\\1\\2', text)
+    return text.replace(_REPH_MARK, '\u0930\u094D')
@@ -0,0 +1,115 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies per key (e.g. per model) with percentile lookups."""
+
+    def __init__(self, window=50, min_samples=5):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, latency):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(latency)
+
+    def percentile(self, key, pct):
+        """Nearest-rank percentile, or None until enough samples exist to trust it."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        rank = min(len(samples) - 1, max(0, int(round(pct * len(samples))) - 1))
+        return samples[rank]
+
+
+class HedgedCaller:
+    """Fires a duplicate request when the first one outlives a percentile of recent latencies.
+
+    Whichever copy finishes first wins. The loser is cancelled if it has not started yet,
+    otherwise its result is simply dropped (the sync SDK cannot abort an in-flight HTTP call).
+    Hedges are paid for from a token bucket that earns `budget_ratio` tokens per request, so
+    at most ~10% extra traffic (by default) ever reaches the API and rate limits stay intact.
+    """
+
+    def __init__(self, percentile=0.95, budget_ratio=0.1, burst=2, window=50, min_samples=5, max_workers=16):
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.burst = burst
+        self.tracker = LatencyTracker(window=window, min_samples=min_samples)
+        self._tokens = float(burst)
+        self._lock = threading.Lock()
+        # Headroom for abandoned losers that are still running in the background
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self.stats = {"requests": 0, "hedges_fired": 0, "hedge_wins": 0, "primary_wins": 0, "budget_denied": 0}
+
+    def _bump(self, field):
+        with self._lock:
+            self.stats[field] += 1
+
+    def _earn_token(self):
+        with self._lock:
+            self.stats["requests"] += 1
+            self._tokens = min(float(self.burst), self._tokens + self.budget_ratio)
+
+    def _spend_token(self):
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.stats["hedges_fired"] += 1
+                return True
+            self.stats["budget_denied"] += 1
+            return False
+
+    def _submit(self, fn):
+        # Each copy runs in its own snapshot of the caller's context (keeps job/page log tags)
+        return self._executor.submit(contextvars.copy_context().run, fn)
+
+    def hedge_delay(self, key):
+        return self.tracker.percentile(key, self.percentile)
+
+    def call(self, fn, key=None):
+        self._earn_token()
+        start = time.perf_counter()
+        primary = self._submit(fn)
+
+        delay = self.hedge_delay(key)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._spend_token():
+            result = primary.result()
+            self.tracker.record(key, time.perf_counter() - start)
+            return result
+
+        hedge_start = time.perf_counter()
+        hedge = self._submit(fn)
+        pending = {primary, hedge}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    last_error = future.exception()
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                if future is hedge:
+                    self._bump("hedge_wins")
+                    self.tracker.record(key, time.perf_counter() - hedge_start)
+                else:
+                    self._bump("primary_wins")
+                    self.tracker.record(key, time.perf_counter() - start)
+                return future.result()
+        raise last_error
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+        fired = stats["hedges_fired"]
+        stats["hedge_win_rate"] = round(stats["hedge_wins"] / fired, 3) if fired else None
+        stats["hedge_rate"] = round(fired / stats["requests"], 3) if stats["requests"] else 0.0
+        return stats
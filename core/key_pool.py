@@ -0,0 +1,106 @@
+import threading
+import time
+
+RATE_LIMIT_MARKERS = ("429", "RESOURCE_EXHAUSTED")
+
+
+def is_rate_limit_error(error):
+    error_str = str(error)
+    return any(marker in error_str for marker in RATE_LIMIT_MARKERS)
+
+
+def mask_key(api_key):
+    """Never log or display a full key: keep only the last 4 characters."""
+    return f"…{api_key[-4:]}" if len(api_key) > 4 else "…"
+
+
+class PooledKey:
+    """One API key with its own client, request spacing, in-flight count and usage metrics."""
+
+    def __init__(self, index, api_key, client, min_interval):
+        self.label = f"key-{index + 1} ({mask_key(api_key)})"
+        self.client = client
+        self.min_interval = min_interval
+        self.next_slot = 0.0
+        self.in_flight = 0
+        self.quarantined_until = 0.0
+        self.metrics = {"requests": 0, "successes": 0, "errors": 0, "rate_limited": 0, "total_latency_s": 0.0}
+
+    def wait_time(self, now):
+        return max(0.0, self.next_slot - now, self.quarantined_until - now)
+
+
+class KeyPool:
+    """Least-loaded selection over several Gemini API keys.
+
+    Each key is paced to `requests_per_minute` (the old fixed 5-second free-tier pause, per key),
+    and a key that answers 429 / RESOURCE_EXHAUSTED is quarantined for `quarantine_seconds`.
+    Aggregate throughput therefore scales with the number of keys provisioned.
+    """
+
+    def __init__(self, api_keys, client_factory, requests_per_minute=12, quarantine_seconds=60,
+                 clock=time.monotonic, sleep=time.sleep):
+        if not api_keys:
+            raise ValueError("KeyPool needs at least one API key.")
+        min_interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.keys = [PooledKey(i, key, client_factory(key), min_interval) for i, key in enumerate(api_keys)]
+        self.quarantine_seconds = quarantine_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return len(self.keys)
+
+    def acquire(self):
+        """Reserves the least-loaded key, waiting for its pacing slot if every key is busy.
+
+        Raises a RESOURCE_EXHAUSTED error when every key is quarantined, so callers surface the
+        usual rate-limit guidance instead of hanging for a minute.
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                if all(key.quarantined_until > now for key in self.keys):
+                    raise RuntimeError("429 RESOURCE_EXHAUSTED: every configured API key is rate limited. Try again shortly.")
+
+                ready = [key for key in self.keys if key.wait_time(now) == 0]
+                if ready:
+                    chosen = min(ready, key=lambda k: (k.in_flight, k.metrics["requests"]))
+                    chosen.in_flight += 1
+                    chosen.next_slot = now + chosen.min_interval
+                    chosen.metrics["requests"] += 1
+                    return chosen
+                delay = min(key.wait_time(now) for key in self.keys)
+            self._sleep(delay)
+
+    def release(self, key, latency, error=None):
+        with self._lock:
+            key.in_flight -= 1
+            key.metrics["total_latency_s"] += latency
+            if error is None:
+                key.metrics["successes"] += 1
+                return
+            key.metrics["errors"] += 1
+            if is_rate_limit_error(error):
+                key.metrics["rate_limited"] += 1
+                key.quarantined_until = self._clock() + self.quarantine_seconds
+
+    def available_keys(self):
+        with self._lock:
+            now = self._clock()
+            return sum(1 for key in self.keys if key.quarantined_until <= now)
+
+    def report(self):
+        with self._lock:
+            now = self._clock()
+            return {
+                key.label: dict(
+                    key.metrics,
+                    total_latency_s=round(key.metrics["total_latency_s"], 3),
+                    in_flight=key.in_flight,
+                    quarantined=key.quarantined_until > now,
+                )
+                for key in self.keys
+            }
@@ -0,0 +1,29 @@
+import importlib
+
+
+class LazyModule:
+    """Module proxy that defers the real import until the first attribute access.
+
+    Keeps cold start cheap for code paths that never touch the dependency
+    (e.g. the "Paste JSON" tab never needs PyMuPDF or the Gemini SDK).
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def is_loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<LazyModule '{self._name}' ({state})>"
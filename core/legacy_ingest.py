@@ -0,0 +1,150 @@
+import os
+from datetime import date, datetime
+from functools import lru_cache
+from core.lazy import LazyModule
+from core.logger import log
+from core.font_converter import krutidev_to_unicode
+
+openpyxl = LazyModule("openpyxl")
+
+LEGACY_FONT_MARKERS = ("kruti", "devlys")
+# Registers repeat the same village / scheme / status strings thousands of times: convert each once
+_to_unicode = lru_cache(maxsize=65536)(krutidev_to_unicode)
+
+# ExcelBuilder writes legacy fonts 2pt larger than the document asks for (see ExcelBuilder._get_font)
+LEGACY_FONT_SIZE_BOOST = 2
+
+
+def is_legacy_font(font_name):
+    return bool(font_name) and any(marker in font_name.lower() for marker in LEGACY_FONT_MARKERS)
+
+
+def _cell_text(value, legacy):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return _to_unicode(value) if legacy else value
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _read_row(row):
+    """Non-empty cells of one streamed row as (column, unicode text, is_bold, font_size)."""
+    cells = []
+    for cell in row:
+        if cell.value is None or cell.value == "":
+            continue
+        font = cell.font
+        legacy = is_legacy_font(font.name)
+        size = int(font.sz or 11) - (LEGACY_FONT_SIZE_BOOST if legacy else 0)
+        cells.append((cell.column, _cell_text(cell.value, legacy), bool(font.b), size))
+    return cells
+
+
+def _text_item(cell):
+    _, text, is_bold, font_size = cell
+    return {"text": text, "is_bold": is_bold, "font_size": font_size}
+
+
+def _row_values(cells, width):
+    values = [""] * max(width, cells[-1][0])
+    for column, text, _, _ in cells:
+        values[column - 1] = text
+    return values
+
+
+def _continues_table(table, cells):
+    """A row after a blank line still belongs to the open table when it fits its columns and isn't a header row."""
+    return len(cells) > 1 and cells[-1][0] <= len(table["headers"]) and not all(cell[2] for cell in cells)
+
+
+def _set_titles(document, pending):
+    first, *rest = pending
+    document["main_title"] = _text_item(first[0])
+    document["subtitles"].extend(_text_item(cell) for cell, _ in rest)
+
+
+def sheet_to_document(rows):
+    """Rebuilds one `document` from streamed rows laid out like ExcelBuilder output.
+
+    A row with several cells after a blank line (or after text) starts a table and is its header
+    row; following rows belong to that table, across blank lines too, until a row that is wider than
+    the table, all bold (the next table's header) or a single cell. Single-cell lines before
+    the first table are the main title and subtitles, a single-cell line directly above a header
+    row (separated from what precedes it) is that table's title, and lines after the last table
+    form the footer.
+    """
+    document = {"main_title": {"text": "", "is_bold": True, "font_size": 14}, "subtitles": [], "tables": []}
+    pending = []          # (text cell, blank line before it) since the last table
+    table = None
+    gap = False
+
+    def open_table(cells):
+        nonlocal table
+        table_title = ""
+        if pending and not gap and (document["tables"] or (pending[-1][1] and len(pending) > 1)):
+            table_title = pending.pop()[0][1]
+        if not document["tables"] and pending:
+            _set_titles(document, pending)
+        else:
+            document["subtitles"].extend(_text_item(cell) for cell, _ in pending)
+        pending.clear()
+        table = {
+            "table_title": table_title,
+            "headers": [{"column_name": text, "is_bold": is_bold} for _, text, is_bold, _ in cells],
+            "rows": [],
+        }
+        document["tables"].append(table)
+
+    for row in rows:
+        cells = _read_row(row)
+        if not cells:
+            gap = True
+            continue
+        if table is not None and (not gap or _continues_table(table, cells)):
+            table["rows"].append(_row_values(cells, len(table["headers"])))
+        elif len(cells) > 1:
+            open_table(cells)
+        else:
+            table = None
+            pending.append((cells[0], gap))
+        gap = False
+
+    footer = {"text": "", "is_bold": False, "font_size": 11}
+    if pending and not document["tables"]:
+        _set_titles(document, pending)
+    elif pending:
+        footer = dict(_text_item(pending[0][0]), text="\n".join(cell[1] for cell, _ in pending))
+    document["footer"] = footer
+    return document
+
+
+def ingest_legacy_workbook(path, recommended_filename=None):
+    """Reads an XLSX (typically Kruti Dev / DevLys typed) into the multi-page `document` JSON, one page per sheet.
+
+    The workbook is opened read-only and streamed row by row, so large registers never sit in
+    memory as openpyxl cell objects; only cells formatted in a legacy font are converted to Unicode.
+    """
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        pages = []
+        for ws in wb.worksheets:
+            document = sheet_to_document(ws.iter_rows())
+            if document["main_title"]["text"] or document["subtitles"] or document["tables"]:
+                pages.append({"document": document})
+    finally:
+        wb.close()
+
+    if not pages:
+        raise ValueError("The workbook has no data to convert.")
+    if recommended_filename is None:
+        recommended_filename = os.path.splitext(os.path.basename(path))[0] + "_Unicode"
+    log.info(f"Ingested {len(pages)} sheet(s) from legacy workbook {path}.")
+    return {"recommended_filename": recommended_filename, "pages": pages}
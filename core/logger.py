@@ -1,26 +1,157 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import uuid
+from contextlib import contextmanager
+from core.env import load_env_once
 
-def setup_logger(name="HindiExtractor", log_file="app.log"):
-    """Sets up a robust enterprise logger."""
+# 🚀 Correlation fields: set once per job / page, picked up by every record logged from that context
+job_id_var = contextvars.ContextVar("job_id", default="-")
+page_var = contextvars.ContextVar("page", default=None)
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - [job=%(job_id)s page=%(page)s] - %(message)s'
+
+
+def new_job_id():
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def log_context(job_id=None, page=None):
+    """Tags every record logged inside the block with a job correlation ID and page number."""
+    tokens = []
+    if job_id is not None:
+        tokens.append((job_id_var, job_id_var.set(job_id)))
+    tokens.append((page_var, page_var.set(page)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def set_log_page(page):
+    """Updates the page number inside an active log_context (used by the per-page loop)."""
+    page_var.set(page)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the correlation context onto the record in the caller's thread, before it is queued."""
+
+    def filter(self, record):
+        if not hasattr(record, "job_id"):
+            record.job_id = job_id_var.get()
+        if not hasattr(record, "page"):
+            record.page = page_var.get()
+        return True
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback out of the message.
+
+    The stock prepare() runs the record through a Formatter, so the queued message already ends with
+    the traceback and exc_info is cleared. Here the message args are merged (they may change before
+    the listener runs) and the traceback is rendered into exc_text, which is what every formatter
+    on the listener side (text or JSON) reads.
+    """
+
+    _exception_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            # Traceback objects pin every frame of the failed call: don't hold them in the queue
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, ready for log shippers."""
+
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": f"{record.filename}:{record.lineno}",
+            "job_id": getattr(record, "job_id", "-"),
+            "page": getattr(record, "page", None),
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def _build_file_handler(log_file, rotation, max_bytes, backup_count, when):
+    # delay=True: the file is only opened on the first record, never at import time
+    if rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(log_file, when=when, backupCount=backup_count, encoding='utf-8', delay=True)
+    return logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+
+
+def stop_logger(logger):
+    """Flushes queued records and stops the background writer (safe to call more than once)."""
+    listener = getattr(logger, "queue_listener", None)
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
+
+def setup_logger(name="HindiExtractor", log_file="app.log", level=None, json_format=None,
+                 rotation=None, max_bytes=None, backup_count=None, when=None):
+    """Sets up a robust enterprise logger.
+
+    Callers only enqueue records (QueueHandler); a background QueueListener thread does the
+    console and rotating-file I/O. Unset options fall back to LOG_LEVEL, LOG_FORMAT (text|json),
+    LOG_ROTATION (size|time), LOG_MAX_BYTES, LOG_BACKUP_COUNT and LOG_ROTATE_WHEN.
+    """
     logger = logging.getLogger(name)
-    
+
     # Only configure if it doesn't already have handlers to prevent duplicate logs
     if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s')
-        
+        load_env_once()
+        level = level or os.environ.get("LOG_LEVEL", "INFO")
+        if json_format is None:
+            json_format = os.environ.get("LOG_FORMAT", "text").lower() == "json"
+        rotation = rotation or os.environ.get("LOG_ROTATION", "size").lower()
+        max_bytes = max_bytes or int(os.environ.get("LOG_MAX_BYTES", 5 * 1024 * 1024))
+        backup_count = backup_count if backup_count is not None else int(os.environ.get("LOG_BACKUP_COUNT", 5))
+        when = when or os.environ.get("LOG_ROTATE_WHEN", "midnight")
+
+        logger.setLevel(level)
+        formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+
         # Console Handler (Prints to terminal)
         ch = logging.StreamHandler()
         ch.setFormatter(formatter)
-        logger.addHandler(ch)
-        
-        # File Handler (Saves to file)
-        fh = logging.FileHandler(log_file, encoding='utf-8')
+
+        # File Handler (Saves to file, rotated by size or time so app.log never grows without limit)
+        fh = _build_file_handler(log_file, rotation, max_bytes, backup_count, when)
         fh.setFormatter(formatter)
-        logger.addHandler(fh)
-        
+
+        # 🚀 Non-blocking hot path: worker threads only pay for a queue put
+        log_queue = queue.SimpleQueue()
+        qh = StructuredQueueHandler(log_queue)
+        qh.addFilter(ContextFilter())
+        logger.addHandler(qh)
+
+        listener = logging.handlers.QueueListener(log_queue, ch, fh, respect_handler_level=True)
+        listener.start()
+        logger.queue_listener = listener
+        atexit.register(stop_logger, logger)
+
     return logger
 
 # Create a global logger instance to be imported by other files
-log = setup_logger()
\ No newline at end of file
+log = setup_logger()
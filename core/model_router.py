@@ -0,0 +1,106 @@
+import re
+import statistics
+import threading
+
+# Matches A-Z / a-z anywhere in extracted text (the prompts forbid Latin script: English must be transliterated)
+LATIN_PATTERN = re.compile(r'[A-Za-z]')
+
+
+def _iter_text_values(document):
+    main_title = document.get("main_title")
+    yield main_title.get("text", "") if isinstance(main_title, dict) else main_title
+
+    subtitles = document.get("subtitles", [])
+    for subtitle in subtitles if isinstance(subtitles, list) else [subtitles]:
+        yield subtitle.get("text", "") if isinstance(subtitle, dict) else subtitle
+
+    for table in document.get("tables", []) or []:
+        if not isinstance(table, dict):
+            continue
+        yield table.get("table_title", "")
+        for header in table.get("headers", []) or []:
+            yield header.get("column_name", "") if isinstance(header, dict) else header
+        for row in table.get("rows", []) or []:
+            if isinstance(row, list):
+                yield from row
+
+    footer = document.get("footer")
+    if isinstance(footer, dict):
+        yield footer.get("text", "")
+    elif isinstance(footer, list):
+        yield from footer
+    else:
+        yield footer
+
+
+def page_quality_issues(parsed_data, parse_failed=False):
+    """Cheap structural checks on one page payload. An empty list means the page can be accepted as-is."""
+    issues = []
+    if parse_failed:
+        issues.append("parse_failure")
+
+    document = parsed_data.get("document", {}) if isinstance(parsed_data, dict) else {}
+    if not isinstance(document, dict):
+        document = {}
+
+    tables = document.get("tables") or []
+    if not isinstance(tables, list) or not tables:
+        issues.append("empty_tables")
+        tables = []
+
+    for table in tables:
+        if not isinstance(table, dict):
+            continue
+        header_count = len(table.get("headers", []) or [])
+        rows = table.get("rows", []) or []
+        if any(not isinstance(row, list) or (header_count and len(row) != header_count) for row in rows):
+            issues.append("ragged_rows")
+            break
+
+    if any(isinstance(value, str) and LATIN_PATTERN.search(value) for value in _iter_text_values(document)):
+        issues.append("latin_characters")
+
+    return issues
+
+
+class ModelRouter:
+    """Tries the cheapest model tier first and escalates a page only when the cheap checks fail.
+
+    Records every routing decision (page, tier, model, latency, issues) so each run can report
+    how many pages the fast tier absorbed and what each tier cost in latency.
+    """
+
+    def __init__(self, tiers):
+        if not tiers:
+            raise ValueError("ModelRouter needs at least one model tier.")
+        self.tiers = list(tiers)
+        self.decisions = []
+        self._lock = threading.Lock()
+
+    def record(self, page, tier, latency, issues, accepted):
+        with self._lock:
+            self.decisions.append({
+                "page": page,
+                "tier": tier,
+                "model": self.tiers[tier],
+                "latency_s": round(latency, 3),
+                "issues": list(issues),
+                "accepted": accepted,
+            })
+
+    def report(self):
+        with self._lock:
+            decisions = list(self.decisions)
+
+        tiers = {}
+        for tier, model in enumerate(self.tiers):
+            calls = [d for d in decisions if d["tier"] == tier]
+            latencies = [d["latency_s"] for d in calls]
+            tiers[model] = {
+                "calls": len(calls),
+                "accepted": sum(1 for d in calls if d["accepted"]),
+                "escalated": sum(1 for d in calls if not d["accepted"]),
+                "mean_latency_s": round(statistics.mean(latencies), 3) if latencies else None,
+                "max_latency_s": max(latencies) if latencies else None,
+            }
+        return {"tiers": tiers, "decisions": decisions}
@@ -0,0 +1,194 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from core.lazy import LazyModule
+from core.logger import log
+
+types = LazyModule("google.genai.types")
+
+# Every cache this app creates is named "<prefix>-<scope>-<model>-<digest>" so it can be found again after a restart
+DISPLAY_PREFIX = "hindiscan"
+CACHE_ERROR_MARKERS = ("cachedcontent", "cached_content", "cached content")
+
+
+def is_cache_error(error):
+    """True when a generate call failed because its cached content is gone, expired or not usable."""
+    error_str = str(error).lower()
+    return any(marker in error_str for marker in CACHE_ERROR_MARKERS)
+
+
+def prompt_digest(model_name, prompt):
+    """Identity of one cached prefix: any change to the prompt text or the model gives a new digest."""
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+class CacheEntry:
+    def __init__(self, name, digest, expires_at):
+        self.name = name
+        self.digest = digest
+        self.expires_at = expires_at
+
+
+class PromptCache:
+    """Server-side cached content for the static prompt prefix, one live cache per (API key, model, prompt scope).
+
+    Caches belong to the key that created them, so every pooled key keeps its own, and each routing
+    tier keeps its own next to the other. An entry is refreshed (TTL extended) once it gets within
+    `refresh_margin_seconds` of expiry, and replaced as soon as the prompt text changes. Only caches
+    this process created are ever deleted: on the first use of a key, live caches with the exact
+    digest being asked for (left by a previous run or another replica) are adopted, everything else
+    is left alone to expire. If creating a cache fails (quota, prompt below the model's minimum
+    cacheable size, unsupported model) callers get None and send the full prompt; creation is not
+    retried for `retry_after_seconds`.
+    """
+
+    def __init__(self, ttl_seconds=3600, refresh_margin_seconds=300, retry_after_seconds=600,
+                 clock=time.monotonic, now=lambda: datetime.now(timezone.utc)):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self._clock = clock
+        self._now = now
+        self._entries = {}
+        self._failed_until = {}
+        self._existing = {}       # key label -> {digest: (cache name, seconds left)} found on the server
+        self._created = set()     # names of caches this process created, the only ones it deletes
+        self._scanned = set()
+        self._slot_locks = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "created": 0, "refreshed": 0, "adopted": 0, "invalidated": 0, "fallbacks": 0}
+
+    def _bump(self, field):
+        with self._lock:
+            self.stats[field] += 1
+
+    def _slot_lock(self, slot):
+        with self._lock:
+            return self._slot_locks.setdefault(slot, threading.Lock())
+
+    def _display_name(self, scope, model_name, digest):
+        model = model_name.rsplit("/", 1)[-1]
+        return f"{DISPLAY_PREFIX}-{scope}-{model}-{digest}"
+
+    def cached_name(self, key_label, client, model_name, scope, prompt):
+        """Name of a live cache holding `prompt` for this key and model, or None to send the prompt inline."""
+        slot = (key_label, model_name, scope)
+        digest = prompt_digest(model_name, prompt)
+        with self._slot_lock((key_label, None)):
+            if key_label not in self._scanned:
+                self._scanned.add(key_label)
+                self._scan_existing(key_label, client)
+
+        with self._slot_lock(slot):
+            entry = self._entries.get(slot)
+            if entry is not None and entry.digest != digest:
+                log.info(f"Prompt cache for {key_label} ({model_name}, {scope}) is stale: prompt changed. Replacing it.")
+                self._delete(client, entry)
+                self._bump("invalidated")
+                entry = None
+
+            now = self._clock()
+            if entry is not None and now >= entry.expires_at:
+                entry = None
+            elif entry is not None and now >= entry.expires_at - self.refresh_margin_seconds:
+                entry = self._refresh(client, slot, entry)
+
+            if entry is None:
+                entry = self._adopt(slot, digest)
+            if entry is None:
+                if self._failed_until.get((slot, digest), 0) > now:
+                    self._bump("fallbacks")
+                    return None
+                entry = self._create(client, slot, model_name, scope, prompt, digest)
+                if entry is None:
+                    self._bump("fallbacks")
+                    return None
+            else:
+                self._bump("hits")
+            return entry.name
+
+    def invalidate(self, key_label, model_name, scope):
+        """Forgets a cache the server no longer recognises (the next call recreates it)."""
+        slot = (key_label, model_name, scope)
+        with self._slot_lock(slot):
+            if self._entries.pop(slot, None) is not None:
+                self._bump("invalidated")
+
+    def _create(self, client, slot, model_name, scope, prompt, digest):
+        try:
+            cached = client.caches.create(
+                model=model_name,
+                config=types.CreateCachedContentConfig(
+                    display_name=self._display_name(scope, model_name, digest),
+                    contents=[prompt],
+                    ttl=f"{self.ttl_seconds}s",
+                ),
+            )
+        except Exception as e:
+            log.warning(f"Prompt cache unavailable for {slot[0]} ({model_name}, {scope}): {e}. Sending the full prompt.")
+            self._failed_until[(slot, digest)] = self._clock() + self.retry_after_seconds
+            self._entries.pop(slot, None)
+            return None
+        entry = CacheEntry(cached.name, digest, self._clock() + self.ttl_seconds)
+        self._entries[slot] = entry
+        with self._lock:
+            self._created.add(cached.name)
+        self._bump("created")
+        log.info(f"Created prompt cache {cached.name} for {slot[0]} ({model_name}, {scope}).")
+        return entry
+
+    def _refresh(self, client, slot, entry):
+        try:
+            client.caches.update(name=entry.name, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s"))
+        except Exception as e:
+            log.warning(f"Prompt cache {entry.name} could not be refreshed ({e}). Recreating it.")
+            self._entries.pop(slot, None)
+            return None
+        entry.expires_at = self._clock() + self.ttl_seconds
+        self._bump("refreshed")
+        return entry
+
+    def _delete(self, client, entry):
+        with self._lock:
+            if entry.name not in self._created:
+                return
+            self._created.discard(entry.name)
+        try:
+            client.caches.delete(name=entry.name)
+        except Exception as e:
+            # It expires on its own anyway
+            log.debug("Could not delete prompt cache %s: %s", entry.name, e)
+
+    def _scan_existing(self, key_label, client):
+        """Remembers this app's live caches on the server for this key, newest first per digest, without touching them."""
+        try:
+            existing = [cached for cached in client.caches.list() if (cached.display_name or "").startswith(f"{DISPLAY_PREFIX}-")]
+        except Exception as e:
+            log.debug("Could not list prompt caches for %s: %s", key_label, e)
+            return
+        found = {}
+        now = self._now()
+        for cached in existing:
+            digest = cached.display_name.rsplit("-", 1)[-1]
+            remaining = (cached.expire_time - now).total_seconds() if cached.expire_time else 0
+            if remaining > found.get(digest, (None, 0))[1]:
+                found[digest] = (cached.name, remaining)
+        self._existing[key_label] = found
+
+    def _adopt(self, slot, digest):
+        """Takes over a live cache found by `_scan_existing` whose digest (model + prompt) matches exactly."""
+        name, remaining = self._existing.get(slot[0], {}).pop(digest, (None, 0))
+        if name is None or remaining <= 0:
+            return None
+        entry = CacheEntry(name, digest, self._clock() + remaining)
+        self._entries[slot] = entry
+        self._bump("adopted")
+        log.info(f"Adopted prompt cache {name} for {slot[0]} ({slot[1]}, {slot[2]}).")
+        return entry
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["live_caches"] = len(self._entries)
+        return stats
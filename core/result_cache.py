@@ -0,0 +1,63 @@
+import hashlib
+from collections import OrderedDict
+
+
+def file_fingerprint(data):
+    """Content hash of an uploaded file (re-uploads and renamed copies map to the same entry)."""
+    return hashlib.sha256(bytes(data)).hexdigest()
+
+
+class ResultCache:
+    """Per-session memory of extracted page JSON and the workbooks rendered from it.
+
+    Extractions are keyed by (file hash, extraction mode), so changing export settings or
+    re-clicking the button never re-calls the model. Rendered workbooks are keyed by the export
+    options under that extraction, so flipping between fonts makes repeat downloads instant.
+    """
+
+    def __init__(self, max_documents=5):
+        self.max_documents = max_documents
+        self._extractions = OrderedDict()
+        self._renders = {}
+
+    @staticmethod
+    def extraction_key(file_hash, extract_tables_only):
+        return (file_hash, "tables_only" if extract_tables_only else "full")
+
+    @staticmethod
+    def render_variant(use_legacy_font, legacy_font_name):
+        # The font name only matters when legacy conversion is on
+        return (True, legacy_font_name) if use_legacy_font else (False, None)
+
+    def __contains__(self, key):
+        return key in self._extractions
+
+    def __len__(self):
+        return len(self._extractions)
+
+    def get_extraction(self, key):
+        if key not in self._extractions:
+            return None
+        self._extractions.move_to_end(key)
+        return self._extractions[key]
+
+    def put_extraction(self, key, extracted_json):
+        self._extractions[key] = extracted_json
+        self._extractions.move_to_end(key)
+        # A fresh extraction invalidates anything rendered from an older one
+        self._renders.pop(key, None)
+        while len(self._extractions) > self.max_documents:
+            evicted_key, _ = self._extractions.popitem(last=False)
+            self._renders.pop(evicted_key, None)
+
+    def clear(self):
+        self._extractions.clear()
+        self._renders.clear()
+
+    def get_render(self, key, variant):
+        return self._renders.get(key, {}).get(variant)
+
+    def put_render(self, key, variant, filename, data):
+        if key not in self._extractions:
+            return
+        self._renders.setdefault(key, {})[variant] = (filename, data)
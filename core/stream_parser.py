@@ -0,0 +1,145 @@
+import json
+
+
+class IncrementalTableParser:
+    """Incremental JSON scanner that emits table headers and rows the moment they are complete.
+
+    Feed it the model's text chunk by chunk. It tracks the JSON path of every container and, as
+    soon as a `tables[i].headers` array or a `tables[i].rows[j]` array closes, decodes just that
+    slice and emits an event. Works for both `{"document": {"tables": ...}}` and the flattened
+    `{"tables": ...}` shape, and ignores any text before the first `{` (e.g. a ```json fence).
+    """
+
+    def __init__(self, on_event=None):
+        self.on_event = on_event
+        self._reset_state()
+
+    def reset(self):
+        """Forgets a failed attempt's output so the retry starts clean.
+
+        Consumers that already counted its rows get a {"type": "rollback", "rows": n} event first.
+        """
+        emitted_rows = sum(len(rows) for rows in self.rows.values())
+        if self.events:
+            self._emit({"type": "rollback", "rows": emitted_rows})
+        self._reset_state()
+
+    def _reset_state(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.events = []
+        # Completed rows per table index (only rows whose closing bracket has arrived)
+        self.rows = {}
+        self.headers = {}
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+
+    @property
+    def is_complete(self):
+        """True once the root object has closed (i.e. the output was not truncated)."""
+        return self.finished
+
+    def feed(self, chunk):
+        if not chunk:
+            return []
+        self.buffer += chunk
+        emitted = []
+        buffer = self.buffer
+        while self.pos < len(buffer) and not self.finished:
+            char = buffer[self.pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._close_string()
+                self.pos += 1
+                continue
+
+            if not self.started:
+                if char == "{":
+                    self.started = True
+                    self._open("object")
+                self.pos += 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = self.pos
+            elif char in "{[":
+                self._open("object" if char == "{" else "array")
+            elif char in "}]":
+                event = self._close()
+                if event:
+                    emitted.append(event)
+            elif char == ",":
+                frame = self._stack[-1]
+                if frame["type"] == "array":
+                    frame["index"] += 1
+                else:
+                    frame["expect_key"] = True
+            elif char == ":":
+                self._stack[-1]["expect_key"] = False
+            self.pos += 1
+        return emitted
+
+    def _child_path(self):
+        if not self._stack:
+            return ()
+        frame = self._stack[-1]
+        step = frame["index"] if frame["type"] == "array" else frame["key"]
+        return frame["path"] + (step,)
+
+    def _open(self, kind):
+        path = self._child_path()
+        self._stack.append({"type": kind, "path": path, "start": self.pos, "index": 0, "key": None, "expect_key": True})
+
+    def _close_string(self):
+        frame = self._stack[-1] if self._stack else None
+        if frame and frame["type"] == "object" and frame["expect_key"]:
+            frame["key"] = json.loads(self.buffer[self._string_start:self.pos + 1])
+
+    def _close(self):
+        frame = self._stack.pop()
+        if not self._stack:
+            self.finished = True
+            return None
+
+        path = frame["path"]
+        if frame["type"] != "array":
+            return None
+        # tables[i].rows[j] -> (..., "tables", i, "rows", j)
+        if len(path) >= 4 and path[-2] == "rows" and path[-4] == "tables" and isinstance(path[-1], int):
+            table_idx = path[-3]
+            row = json.loads(self.buffer[frame["start"]:self.pos + 1])
+            self.rows.setdefault(table_idx, []).append(row)
+            return self._emit({"type": "row", "table": table_idx, "row": row})
+        # tables[i].headers -> (..., "tables", i, "headers")
+        if len(path) >= 3 and path[-1] == "headers" and path[-3] == "tables":
+            table_idx = path[-2]
+            headers = json.loads(self.buffer[frame["start"]:self.pos + 1])
+            self.headers[table_idx] = headers
+            return self._emit({"type": "headers", "table": table_idx, "headers": headers})
+        return None
+
+    def _emit(self, event):
+        self.events.append(event)
+        if self.on_event:
+            self.on_event(event)
+        return event
+
+    @property
+    def open_table(self):
+        """Index of the table still being generated when the stream stopped, if any."""
+        for frame in reversed(self._stack):
+            path = frame["path"]
+            if len(path) >= 2 and path[-2] == "tables" and isinstance(path[-1], int):
+                return path[-1]
+        return None
@@ -0,0 +1,268 @@
+import io
+from core.lazy import LazyModule
+
+np = LazyModule("numpy")
+Image = LazyModule("PIL.Image")
+
+# A pixel row is a ruling-line candidate when it holds one dark run spanning this share of the page
+# width (short gaps from scanning noise are bridged). Text lines never do; page-border sides don't either
+MIN_LINE_SPAN = 0.25
+MAX_RUN_GAP = 3
+DARK_THRESHOLD = 128
+# Inside the table, a separator must cover this share of the *table* width (partial lines under
+# merged header cells don't split rows)
+LINE_COVERAGE = 0.9
+# Lines of one table share their left / right ends within this share of the page width
+EXTENT_TOLERANCE = 0.02
+# A gap this many times the median row height is not a row: it separates the table from a
+# page border or title underline that happens to have the same width
+MAX_ROW_GAP = 5
+# Leading rows this much taller than a body row belong to a multi-row header
+HEADER_ROW_RATIO = 1.5
+
+
+def _collapse(rows):
+    """Consecutive pixel rows of one 2-3 px thick line -> the line's centre row."""
+    lines = []
+    run_start = prev = None
+    for y in rows:
+        if prev is None or y != prev + 1:
+            if run_start is not None:
+                lines.append((run_start + prev) // 2)
+            run_start = y
+        prev = y
+    if run_start is not None:
+        lines.append((run_start + prev) // 2)
+    return lines
+
+
+def _longest_run(dark_row, max_gap=MAX_RUN_GAP):
+    """(start, end) of the longest dark run in one pixel row, bridging gaps of up to `max_gap` pixels."""
+    xs = np.flatnonzero(dark_row)
+    if xs.size == 0:
+        return 0, -1
+    breaks = np.flatnonzero(np.diff(xs) > max_gap + 1)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [xs.size - 1]))
+    longest = int(np.argmax(xs[ends] - xs[starts]))
+    return int(xs[starts[longest]]), int(xs[ends[longest]])
+
+
+def find_ruling_lines(dark, min_span=MIN_LINE_SPAN):
+    """Horizontal lines of a binarized page as (y, left, right), one entry per (thick) line."""
+    width = dark.shape[1]
+    min_length = min_span * width
+    runs = {}
+    # Cheap prefilter: a row can't hold a long run without that many dark pixels in total
+    for y in np.flatnonzero(dark.sum(axis=1) >= min_length).tolist():
+        left, right = _longest_run(dark[y])
+        if right - left + 1 >= min_length:
+            runs[y] = (left, right)
+
+    lines = []
+    for y in _collapse(sorted(runs)):
+        # The centre row of a thick line can be a few pixels short: use the nearest row that had a run
+        nearest = min(runs, key=lambda row: abs(row - y))
+        lines.append((y, *runs[nearest]))
+    return lines
+
+
+class TableRegion:
+    """Bounding box of the ruled table on a page and the full-width separators inside it, top to bottom."""
+
+    def __init__(self, left, right, separators):
+        self.left = left
+        self.right = right
+        self.separators = separators
+
+    @property
+    def top(self):
+        return self.separators[0]
+
+    @property
+    def bottom(self):
+        return self.separators[-1]
+
+
+def _same_table(lines, median_gap):
+    """Splits same-width lines wherever the gap is too large to be a table row; keeps the longest run."""
+    runs, current = [], [lines[0]]
+    for line in lines[1:]:
+        if line[0] - current[-1][0] > MAX_ROW_GAP * median_gap:
+            runs.append(current)
+            current = []
+        current.append(line)
+    runs.append(current)
+    return max(runs, key=len)
+
+
+def find_table(gray, dark_threshold=DARK_THRESHOLD):
+    """Locates the main ruled table of a grayscale page, or None when there is none.
+
+    Ruling lines are grouped by their left / right ends; the biggest group with regular spacing is
+    the table (a page border or a title underline has other ends, or sits too far away). Row
+    separators are then the lines covering LINE_COVERAGE of that table's width.
+    """
+    dark = np.asarray(gray) < dark_threshold
+    if dark.size == 0:
+        return None
+    lines = find_ruling_lines(dark)
+    if len(lines) < 3:
+        return None
+
+    tolerance = EXTENT_TOLERANCE * dark.shape[1]
+    def same_ends(a, b):
+        return abs(a[1] - b[1]) <= tolerance and abs(a[2] - b[2]) <= tolerance
+    anchor = max(lines, key=lambda line: sum(same_ends(line, other) for other in lines))
+    group = [line for line in lines if same_ends(anchor, line)]
+    if len(group) < 3:
+        return None
+    median_gap = float(np.median(np.diff([line[0] for line in group])))
+    group = _same_table(group, median_gap)
+    if len(group) < 3:
+        return None
+
+    left = int(np.median([line[1] for line in group]))
+    right = int(np.median([line[2] for line in group]))
+    top, bottom = group[0][0], group[-1][0]
+    coverage = dark[top:bottom + 1, left:right + 1].mean(axis=1)
+    separators = [top + y for y in _collapse(np.flatnonzero(coverage >= LINE_COVERAGE).tolist())]
+    return TableRegion(left, right, separators)
+
+
+class TilePlan:
+    """Horizontal bands for one dense page: the header band is repeated on top of every later tile."""
+
+    def __init__(self, height, header_band, bands):
+        self.height = height
+        self.header_band = header_band
+        self.bands = bands
+
+    def __len__(self):
+        return len(self.bands)
+
+
+def header_rows(separators):
+    """Rows at the top of the table that form its header: the first row plus any taller rows right after it."""
+    gaps = np.diff(separators)
+    body_height = float(np.median(gaps))
+    rows = 1
+    while rows < len(gaps) - 1 and gaps[rows] > HEADER_ROW_RATIO * body_height:
+        rows += 1
+    return rows
+
+
+def plan_tiles(table, height, rows_per_tile=25, dense_row_threshold=40):
+    """Splits the table body into row bands, or returns None when the page isn't dense enough to need it.
+
+    The header is the table's first row (plus following rows taller than a body row, for multi-row
+    headers); every later gap between separators is one body row. The first tile also keeps
+    everything above the table (titles) and the last keeps everything below it (footer), so the
+    stitched page loses nothing.
+    """
+    if table is None or len(table.separators) < 3:
+        return None
+    header_count = header_rows(table.separators)
+    body_edges = table.separators[header_count:]
+    body_rows = len(body_edges) - 1
+    if body_rows <= dense_row_threshold:
+        return None
+
+    header_band = (table.separators[0], table.separators[header_count])
+    bands = []
+    for start in range(0, body_rows, rows_per_tile):
+        end = min(start + rows_per_tile, body_rows)
+        bands.append([body_edges[start], body_edges[end]])
+
+    # A tiny trailing band isn't worth its own request: fold it into the previous one
+    remainder = body_rows % rows_per_tile
+    if len(bands) > 1 and 0 < remainder < rows_per_tile // 3:
+        bands[-2][1] = bands[-1][1]
+        bands.pop()
+
+    bands[0][0] = 0
+    bands[-1][1] = height
+    return TilePlan(height, header_band, [tuple(band) for band in bands])
+
+
+def plan_page_tiles(img_bytes, rows_per_tile=25, dense_row_threshold=40):
+    """Decodes a rasterized page and plans its tiles (None for normal pages)."""
+    with Image.open(io.BytesIO(img_bytes)) as img:
+        gray = img.convert("L")
+        return plan_tiles(find_table(gray), gray.height, rows_per_tile, dense_row_threshold)
+
+
+def render_tiles(img_bytes, plan, quality=90):
+    """JPEG bytes for every band; tiles after the first get the header band stacked on top."""
+    tiles = []
+    with Image.open(io.BytesIO(img_bytes)) as img:
+        page = img.convert("RGB")
+        width = page.width
+        header = page.crop((0, plan.header_band[0], width, plan.header_band[1] + 1))
+        for tile_idx, (top, bottom) in enumerate(plan.bands):
+            band = page.crop((0, top, width, bottom + 1))
+            if tile_idx > 0:
+                stacked = Image.new("RGB", (width, header.height + band.height), "white")
+                stacked.paste(header, (0, 0))
+                stacked.paste(band, (0, header.height))
+                band = stacked
+            buffer = io.BytesIO()
+            band.save(buffer, format="JPEG", quality=quality)
+            tiles.append(buffer.getvalue())
+    return tiles
+
+
+def _header_names(table):
+    return [h.get("column_name", "") if isinstance(h, dict) else str(h) for h in table.get("headers", []) or []]
+
+
+def tiles_agree(tile_pages):
+    """True when every tile continues the previous tile's last table under exactly the same column names."""
+    previous = None
+    for page in tile_pages:
+        document = page.get("document", {}) if isinstance(page, dict) else {}
+        tables = [table for table in document.get("tables", []) or [] if isinstance(table, dict)]
+        if not tables:
+            return False
+        if previous is not None and _header_names(tables[0]) != previous:
+            return False
+        previous = _header_names(tables[-1])
+    return True
+
+
+def merge_tile_pages(tile_pages):
+    """Stitches per-tile page payloads back into one page in the normal `document` schema.
+
+    Titles come from the first tile, the footer from the last tile that has one, and a table
+    whose headers match the previous table's headers continues it (repeated header rows that
+    the model transcribed as data are dropped).
+    """
+    first = tile_pages[0] if tile_pages else {}
+    first_doc = first.get("document", {})
+    merged = {
+        "main_title": first_doc.get("main_title", {"text": "", "is_bold": True, "font_size": 14}),
+        "subtitles": first_doc.get("subtitles", []),
+        "tables": [],
+        "footer": {"text": "", "is_bold": False, "font_size": 11},
+    }
+
+    for page in tile_pages:
+        document = page.get("document", {})
+        for table in document.get("tables", []) or []:
+            if not isinstance(table, dict):
+                continue
+            names = _header_names(table)
+            rows = [row for row in table.get("rows", []) or [] if row != names]
+            previous = merged["tables"][-1] if merged["tables"] else None
+            if previous is not None and names and names == _header_names(previous):
+                previous["rows"].extend(rows)
+            else:
+                merged["tables"].append(dict(table, rows=rows))
+        footer = document.get("footer")
+        if footer and (footer.get("text") if isinstance(footer, dict) else True):
+            merged["footer"] = footer
+
+    result = {"document": merged}
+    if "recommended_filename" in first:
+        result["recommended_filename"] = first["recommended_filename"]
+    return result
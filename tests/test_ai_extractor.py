@@ -1,10 +1,16 @@
 import os
 import pytest
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 from core.ai_extractor import AIExtractor
 from core.config import MASTER_PROMPT, TABLES_ONLY_PROMPT
 import fitz
 
+# 🚀 PYTEST FIXTURE: Disables the per-key free-tier pacing so escalations don't sleep 5 seconds in tests
+@pytest.fixture(autouse=True)
+def no_key_pacing(monkeypatch):
+    monkeypatch.setenv("GEMINI_KEY_RPM", "0")
+
 # 🚀 PYTEST FIXTURE: Automatically handles a REAL dummy PDF for any test that needs it
 @pytest.fixture
 def dummy_pdf(tmp_path):
@@ -26,6 +32,14 @@ def test_missing_api_key(invalid_key):
         with pytest.raises(ValueError):
             AIExtractor(api_key=invalid_key)
 
+# Test 1b: A blank BYOK key never falls back to the app's own keys
+@pytest.mark.parametrize("blank_key", ["", "   "])
+def test_blank_byok_key_does_not_use_app_keys(blank_key):
+    """Proves a user who types only spaces gets an error instead of silently spending the shared quota."""
+    with patch.dict(os.environ, {"GEMINI_API_KEY": "APPKEY1234", "GEMINI_API_KEYS": "APPKEY5678"}, clear=True):
+        with pytest.raises(ValueError):
+            AIExtractor(api_key=blank_key)
+
 # Test 2: Bombard the regex cleaner with multiple types of AI formatting hallucinations
 @pytest.mark.parametrize("dirty_json, expected_clean", [
     # Scenario A: Standard Markdown wrapper with conversational text
@@ -108,4 +122,346 @@ def test_tables_only_prompt_injection(mock_client_class, dummy_pdf):
     
     # Verify the TABLES_ONLY_PROMPT is strictly in the payload
     assert TABLES_ONLY_PROMPT in sent_prompt
-    assert MASTER_PROMPT not in sent_prompt
\ No newline at end of file
+    assert MASTER_PROMPT not in sent_prompt
+
+# Test 6: Model routing (fast tier first, strong tier only on failed checks)
+@patch('core.ai_extractor.genai.Client')
+@pytest.mark.parametrize("fast_output, expected_models", [
+    # Clean Devanagari table: the fast tier's answer is accepted
+    ('{"document": {"tables": [{"headers": [{"column_name": "नाम"}], "rows": [["राम"]]}]}}', ["fast"]),
+    # Latin characters violate the transliteration rule: escalate
+    ('{"document": {"tables": [{"headers": [{"column_name": "Name"}], "rows": [["Ram"]]}]}}', ["fast", "strong"]),
+    # Unreadable output: escalate
+    ('I could not read this page.', ["fast", "strong"]),
+])
+def test_model_routing_escalation(mock_client_class, dummy_pdf, fast_output, expected_models):
+    """Proves pages only reach the strong model when the cheap checks fail, and every decision is recorded."""
+    strong_response = MagicMock()
+    strong_response.text = '{"document": {"tables": [{"headers": [{"column_name": "नाम"}], "rows": [["राम"]]}]}}'
+    fast_response = MagicMock()
+    fast_response.text = fast_output
+
+    mock_client_instance = MagicMock()
+    mock_client_class.return_value = mock_client_instance
+    mock_client_instance.models.generate_content.side_effect = lambda model, **kwargs: fast_response if model == "fast" else strong_response
+
+    with patch.dict(os.environ, {"GEMINI_FAST_MODEL": "fast", "GEMINI_MODEL": "strong"}):
+        extractor = AIExtractor(api_key="FAKE_KEY", model_routing=True)
+    stats = {}
+    result = extractor.process_document(dummy_pdf, mime_type="application/pdf", stats_callback=stats.update)
+
+    called_models = [call.kwargs["model"] for call in mock_client_instance.models.generate_content.call_args_list]
+    assert called_models == expected_models
+    assert result["pages"][0]["document"]["tables"][0]["rows"] == [["राम"]]
+
+    decisions = stats["routing"]["decisions"]
+    assert [d["model"] for d in decisions] == expected_models
+    assert decisions[-1]["accepted"] is True
+
+
+# 🚀 PYTEST FIXTURE: Multi-page PDF for the key pool / parallel page tests
+@pytest.fixture
+def three_page_pdf(tmp_path):
+    doc_path = tmp_path / "three_pages.pdf"
+    doc = fitz.open()
+    for _ in range(3):
+        doc.new_page()
+    doc.save(str(doc_path))
+    doc.close()
+    return str(doc_path)
+
+# Test 7: Key pool (pages spread across keys, 429 on one key retried on another)
+@patch('core.ai_extractor.genai.Client')
+def test_key_pool_spreads_pages_and_survives_429(mock_client_class, three_page_pdf):
+    """Proves pooled keys share the pages, a rate-limited key is quarantined, and page order is preserved."""
+    clients = {}
+
+    def make_client(api_key):
+        client = MagicMock()
+        def generate(model, contents, config):
+            if api_key == "KEY_A":
+                raise RuntimeError("429 RESOURCE_EXHAUSTED")
+            response = MagicMock()
+            response.text = '{"document": {"tables": [{"headers": [{"column_name": "नाम"}], "rows": [["राम"]]}]}}'
+            return response
+        client.models.generate_content.side_effect = generate
+        clients[api_key] = client
+        return client
+
+    mock_client_class.side_effect = lambda api_key: make_client(api_key)
+
+    extractor = AIExtractor(api_keys=["KEY_A", "KEY_B", "KEY_C"], model_routing=False)
+    stats = {}
+    result = extractor.process_document(three_page_pdf, mime_type="application/pdf", stats_callback=stats.update)
+
+    assert len(result["pages"]) == 3
+    assert all(page["document"]["tables"][0]["rows"] == [["राम"]] for page in result["pages"])
+
+    key_stats = stats["keys"]
+    assert key_stats["key-1 (…EY_A)"]["rate_limited"] >= 1
+    assert key_stats["key-1 (…EY_A)"]["quarantined"] is True
+    assert sum(stats["successes"] for stats in key_stats.values()) == 3
+
+
+def stream_chunks(text, finish_reason="STOP", size=20):
+    """Fake SDK stream: small text chunks, finish_reason on the last one."""
+    pieces = [text[i:i + size] for i in range(0, len(text), size)]
+    return [SimpleNamespace(text=piece, candidates=[SimpleNamespace(finish_reason=finish_reason if i == len(pieces) - 1 else None)])
+            for i, piece in enumerate(pieces)]
+
+# Test 8: Streaming mode (rows reported live, truncated tables resumed instead of failing the page)
+@patch('core.ai_extractor.genai.Client')
+def test_streaming_resumes_truncated_table(mock_client_class, dummy_pdf):
+    """Proves streamed rows reach row_callback and a MAX_TOKENS cut is continued mid-table."""
+    truncated = '{"document": {"main_title": {"text": "सूची"}, "tables": [{"headers": [{"column_name": "क्रम"}, {"column_name": "नाम"}], "rows": [["1", "राम"], ["2", "श्याम"], ["3", "मो'
+    continuation = '{"tables": [{"headers": [{"column_name": "क्रम"}, {"column_name": "नाम"}], "rows": [["2", "श्याम"], ["3", "मोहन"], ["4", "सीता"]]}], "footer": {"text": "समाप्त"}}'
+
+    mock_client_instance = MagicMock()
+    mock_client_class.return_value = mock_client_instance
+    mock_client_instance.models.generate_content_stream.side_effect = [
+        iter(stream_chunks(truncated, finish_reason="MAX_TOKENS")),
+        iter(stream_chunks(continuation)),
+    ]
+
+    events = []
+    extractor = AIExtractor(api_key="FAKE_KEY", model_routing=False, stream=True)
+    result = extractor.process_document(dummy_pdf, mime_type="application/pdf", row_callback=lambda page, event: events.append((page, event["type"])))
+
+    document = result["pages"][0]["document"]
+    assert document["tables"][0]["rows"] == [["1", "राम"], ["2", "श्याम"], ["3", "मोहन"], ["4", "सीता"]]
+    assert document["footer"]["text"] == "समाप्त"
+    assert mock_client_instance.models.generate_content.call_count == 0
+
+    # The continuation request carries the last complete row
+    resume_contents = mock_client_instance.models.generate_content_stream.call_args_list[1].kwargs["contents"]
+    assert '["2", "श्याम"]' in resume_contents[-1]
+
+    assert events[0] == (0, "restart")
+    assert events.count((0, "row")) >= 4
+
+
+# Test 8b: A stream cut by a 429 is retried on another key from a clean parser
+@patch('core.ai_extractor.genai.Client')
+def test_streaming_retry_after_429_starts_clean(mock_client_class, dummy_pdf):
+    """Proves the failed attempt's rows are rolled back and not mistaken for a truncated answer."""
+    answer = '{"document": {"tables": [{"headers": [{"column_name": "क्रम"}, {"column_name": "नाम"}], "rows": [["1", "राम"], ["2", "श्याम"]]}]}}'
+    attempts = []
+
+    def stream(model, contents, config):
+        attempts.append(contents)
+        chunks = stream_chunks(answer)
+        if len(attempts) == 1:
+            def cut_off():
+                yield from chunks[:-2]
+                raise RuntimeError("429 RESOURCE_EXHAUSTED")
+            return cut_off()
+        return iter(chunks)
+
+    mock_client_instance = MagicMock()
+    mock_client_class.return_value = mock_client_instance
+    mock_client_instance.models.generate_content_stream.side_effect = stream
+
+    events = []
+    extractor = AIExtractor(api_keys=["KEY_A", "KEY_B"], model_routing=False, stream=True)
+    result = extractor.process_document(dummy_pdf, mime_type="application/pdf", row_callback=lambda page, event: events.append(event))
+
+    assert len(attempts) == 2  # no continuation request
+    assert result["pages"][0]["document"]["tables"][0]["rows"] == [["1", "राम"], ["2", "श्याम"]]
+    types_after_rollback = [event["type"] for event in events[[e["type"] for e in events].index("rollback"):]]
+    assert types_after_rollback == ["rollback", "headers", "row", "row"]
+    rows_counted = sum(1 for e in events if e["type"] == "row") - sum(e["rows"] for e in events if e["type"] == "rollback")
+    assert rows_counted == 2
+
+# Test 9: Dense pages are tiled, extracted per band and stitched back together
+@patch('core.ai_extractor.genai.Client')
+def test_dense_page_is_tiled(mock_client_class, tmp_path):
+    """Proves a dense register is split into parallel tile requests that merge into one page."""
+    from PIL import Image, ImageDraw
+    img = Image.new("L", (600, 100 + 61 * 20 + 80), 255)
+    draw = ImageDraw.Draw(img)
+    for line in range(62):
+        draw.line([(20, 100 + line * 20), (580, 100 + line * 20)], fill=0, width=2)
+    image_path = tmp_path / "register.png"
+    img.save(str(image_path))
+
+    def generate(model, contents, config):
+        tile_number = contents[0].split("This image is slice ")[1].split(" ")[0]
+        response = MagicMock()
+        response.text = '{"document": {"tables": [{"headers": [{"column_name": "क्रम"}], "rows": [["%s"]]}]}}' % tile_number
+        return response
+
+    mock_client_instance = MagicMock()
+    mock_client_class.return_value = mock_client_instance
+    mock_client_instance.models.generate_content.side_effect = generate
+
+    extractor = AIExtractor(api_key="FAKE_KEY", model_routing=False, tiling_enabled=True)
+    stats = {}
+    result = extractor.process_document(str(image_path), mime_type="image/png", stats_callback=stats.update)
+
+    assert len(result["pages"]) == 1
+    assert result["pages"][0]["document"]["tables"][0]["rows"] == [["1"], ["2"], ["3"]]
+    assert stats["tiling"] == {1: 3}
+
+
+# Test 9b: Tiles that come back under different headers fall back to one whole-page request
+@patch('core.ai_extractor.genai.Client')
+def test_mismatched_tiles_fall_back_to_whole_page(mock_client_class, tmp_path):
+    """Proves a page is never returned as several tables just because the tiles disagreed on headers."""
+    from PIL import Image, ImageDraw
+    img = Image.new("L", (600, 100 + 61 * 20 + 80), 255)
+    draw = ImageDraw.Draw(img)
+    for line in range(62):
+        draw.line([(20, 100 + line * 20), (580, 100 + line * 20)], fill=0, width=2)
+    image_path = tmp_path / "register.png"
+    img.save(str(image_path))
+
+    def generate(model, contents, config):
+        header = contents[0].split("This image is slice ")[1].split(" ")[0] if "This image is slice " in contents[0] else "पूरा"
+        response = MagicMock()
+        response.text = '{"document": {"tables": [{"headers": [{"column_name": "%s"}], "rows": [["1"]]}]}}' % header
+        return response
+
+    mock_client_instance = MagicMock()
+    mock_client_class.return_value = mock_client_instance
+    mock_client_instance.models.generate_content.side_effect = generate
+
+    extractor = AIExtractor(api_key="FAKE_KEY", model_routing=False, tiling_enabled=True)
+    stats = {}
+    result = extractor.process_document(str(image_path), mime_type="image/png", stats_callback=stats.update)
+
+    assert mock_client_instance.models.generate_content.call_count == 4
+    assert [t["headers"][0]["column_name"] for t in result["pages"][0]["document"]["tables"]] == ["पूरा"]
+    assert stats["tiling"] == {}
+
+
+# Test 10: Near-duplicate pages are extracted once and reused across the batch
+@patch('core.ai_extractor.genai.Client')
+def test_duplicate_pages_are_extracted_once(mock_client_class, three_page_pdf):
+    """Proves identical pages share one API call and a shared index reuses results for the next document."""
+    from core.dedup import PerceptualHashIndex
+
+    mock_client_instance = MagicMock()
+    mock_client_class.return_value = mock_client_instance
+    mock_response = MagicMock()
+    mock_response.text = '{"document": {"tables": [{"headers": [{"column_name": "नाम"}], "rows": [["राम"]]}]}}'
+    mock_client_instance.models.generate_content.return_value = mock_response
+
+    index = PerceptualHashIndex()
+    extractor = AIExtractor(api_key="FAKE_KEY", model_routing=False, dedup_pages=True)
+    stats = {}
+    result = extractor.process_document(three_page_pdf, mime_type="application/pdf", dedup_index=index, stats_callback=stats.update)
+
+    assert mock_client_instance.models.generate_content.call_count == 1
+    assert [page["document"]["tables"][0]["rows"] for page in result["pages"]] == [[["राम"]]] * 3
+    # Reused pages are independent copies, not aliases of the original
+    assert result["pages"][1] is not result["pages"][0]
+    assert stats["dedup"]["duplicates"] == {2: 1, 3: 1}
+
+    # Same batch, second document: nothing is uploaded at all
+    extractor.process_document(three_page_pdf, mime_type="application/pdf", dedup_index=index)
+    assert mock_client_instance.models.generate_content.call_count == 1
+    assert index.stats == {"pages": 6, "duplicates": 5, "reused_across_documents": 3, "rejected_by_content_check": 0}
+
+    # A different extraction mode never reuses full-layout results
+    extractor.process_document(three_page_pdf, mime_type="application/pdf", extract_tables_only=True, dedup_index=index)
+    assert mock_client_instance.models.generate_content.call_count == 2
+
+
+# Test 10b: Register pages that only differ in their values are never deduplicated
+@patch('core.ai_extractor.genai.Client')
+def test_register_pages_with_different_values_are_all_extracted(mock_client_class, tmp_path):
+    """Proves a close dHash alone never hands one page's data to another page."""
+    import random
+    rnd = random.Random(7)
+    doc_path = tmp_path / "register.pdf"
+    doc = fitz.open()
+    for _ in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 60), "District Register 2024", fontsize=14)
+        for row in range(20):
+            y = 100 + row * 30
+            page.draw_line((50, y), (550, y))
+            for col in range(4):
+                page.insert_text((60 + col * 120, y + 20), str(rnd.randint(1000, 9999)), fontsize=10)
+    doc.save(str(doc_path))
+    doc.close()
+
+    mock_client_instance = MagicMock()
+    mock_client_class.return_value = mock_client_instance
+    mock_response = MagicMock()
+    mock_response.text = '{"document": {"tables": [{"headers": [{"column_name": "नाम"}], "rows": [["राम"]]}]}}'
+    mock_client_instance.models.generate_content.return_value = mock_response
+
+    extractor = AIExtractor(api_key="FAKE_KEY", model_routing=False, dedup_pages=True)
+    stats = {}
+    extractor.process_document(str(doc_path), mime_type="application/pdf", stats_callback=stats.update)
+
+    assert mock_client_instance.models.generate_content.call_count == 3
+    assert stats["dedup"]["duplicates"] == {}
+
+
+# Test 11: Prompt prefix served from a server-side cache
+@patch('core.ai_extractor.genai.Client')
+def test_prompt_cache_sends_only_the_page(mock_client_class, tmp_path):
+    """Proves cached requests omit the static prompt and a rejected cache falls back to the full prompt."""
+    from core.ai_extractor import STATIC_PROMPTS
+    mock_client_instance = MagicMock()
+    mock_client_class.return_value = mock_client_instance
+    mock_client_instance.caches.list.return_value = []
+    mock_client_instance.caches.create.return_value = SimpleNamespace(name="cachedContents/abc")
+
+    calls = []
+    def generate(model, contents, config):
+        calls.append((contents, config.cached_content))
+        if len(calls) == 2:
+            raise RuntimeError("404 NOT_FOUND: CachedContent not found")
+        response = MagicMock()
+        response.text = '{"document": {"tables": [{"headers": [{"column_name": "नाम"}], "rows": [["राम"]]}]}}'
+        return response
+    mock_client_instance.models.generate_content.side_effect = generate
+
+    extractor = AIExtractor(api_key="FAKE_KEY", model_routing=False, prompt_cache=True)
+    image_path = tmp_path / "page.jpg"
+    image_path.write_bytes(b"image-bytes")
+    extractor.process_document(str(image_path), mime_type="image/jpeg")
+    stats = {}
+    extractor.process_document(str(image_path), mime_type="image/jpeg", extract_tables_only=True, stats_callback=stats.update)
+
+    create_kwargs = mock_client_instance.caches.create.call_args_list[0].kwargs
+    assert create_kwargs["config"].contents == [STATIC_PROMPTS["full"]]
+    # First page: image only, served from the cache
+    assert calls[0][1] == "cachedContents/abc" and len(calls[0][0]) == 1
+    # Second document: cache rejected, retried inline on the same key
+    assert calls[2][1] is None and calls[2][0][0] == STATIC_PROMPTS["tables_only"]
+    assert stats["prompt_cache"]["invalidated"] == 1
+
+
+# Test 12: Concurrent jobs on one shared extractor keep their own run stats
+@patch('core.ai_extractor.genai.Client')
+def test_concurrent_jobs_do_not_share_run_stats(mock_client_class, tmp_path):
+    """Proves two sessions extracting at the same time each get only their own routing decisions."""
+    import threading
+    both_in_flight = threading.Barrier(2, timeout=10)
+    def generate(model, contents, config):
+        both_in_flight.wait()
+        response = MagicMock()
+        response.text = '{"document": {"tables": [{"headers": [{"column_name": "नाम"}], "rows": [["राम"]]}]}}'
+        return response
+    mock_client_instance = MagicMock()
+    mock_client_class.return_value = mock_client_instance
+    mock_client_instance.models.generate_content.side_effect = generate
+
+    extractor = AIExtractor(api_key="FAKE_KEY", model_routing=False)
+    image_path = tmp_path / "page.jpg"
+    image_path.write_bytes(b"image-bytes")
+
+    stats = [{}, {}]
+    jobs = [threading.Thread(target=extractor.process_document, args=(str(image_path), "image/jpeg"), kwargs={"stats_callback": job_stats.update})
+            for job_stats in stats]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+
+    assert [len(job_stats["routing"]["decisions"]) for job_stats in stats] == [1, 1]
+    assert not hasattr(extractor, "last_run_stats")
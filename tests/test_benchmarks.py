@@ -0,0 +1,39 @@
+import json
+import pytest
+from benchmarks.bench_pipeline import make_document, count_units, compare, main
+
+# Test 1: Synthetic documents must be reproducible, otherwise baselines are meaningless
+def test_synthetic_document_is_deterministic():
+    """Proves the same seed always yields the same payload and the requested shape."""
+    first = make_document(pages=2, tables=3, rows=7, words_per_cell=2, seed=7)
+    second = make_document(pages=2, tables=3, rows=7, words_per_cell=2, seed=7)
+
+    assert first == second
+    assert count_units(first)["pages"] == 2
+    assert count_units(first)["rows"] == 2 * 3 * 7
+
+# Test 2: Baseline comparison
+@pytest.mark.parametrize("current_time, expected_regressions", [
+    (0.110, 0),  # +10% is inside the 20% budget
+    (0.150, 1),  # +50% must be flagged
+])
+def test_compare_flags_regressions(current_time, expected_regressions):
+    """Proves the comparison mode only fails on slowdowns beyond the threshold."""
+    baseline = {"results": [{"size": "tiny", "stage": "build", "wall_median_s": 0.100, "peak_mem_bytes": 1000}]}
+    current = [{"size": "tiny", "stage": "build", "wall_median_s": current_time, "peak_mem_bytes": 1000}]
+
+    _, regressions = compare(current, baseline, threshold=0.20)
+    assert len(regressions) == expected_regressions
+
+# Test 3: End-to-end smoke run of the CLI with machine-readable output
+def test_cli_writes_json_report(tmp_path):
+    """Proves a tiny run completes for every stage and round-trips through --compare."""
+    report_path = tmp_path / "bench.json"
+    assert main(["--sizes", "tiny", "--repeat", "1", "--json", str(report_path)]) == 0
+
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    stages = {result["stage"] for result in report["results"]}
+    assert stages == {"heal", "font", "build", "legacy", "autofit"}
+
+    # Comparing a run against itself with a generous threshold can never regress
+    assert main(["--sizes", "tiny", "--repeat", "1", "--compare", str(report_path), "--threshold", "10"]) == 0
@@ -0,0 +1,81 @@
+import io
+import random
+import fitz
+import pytest
+from PIL import Image
+from core.dedup import page_fingerprint, hamming, same_content, PerceptualHashIndex, DEFAULT_THRESHOLD
+
+def register_page(values, fontsize=10):
+    """150 DPI render of a ruled register: same title and rules on every page, only the cell values change."""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 60), "District Register 2024", fontsize=14)
+    for row, row_values in enumerate(values):
+        y = 100 + row * 30
+        page.draw_line((50, y), (550, y))
+        for col, value in enumerate(row_values):
+            page.insert_text((60 + col * 120, y + 20), value, fontsize=fontsize)
+    img_bytes = page.get_pixmap(dpi=150).tobytes("jpeg")
+    doc.close()
+    return img_bytes
+
+def random_values(seed):
+    rnd = random.Random(seed)
+    return [[str(rnd.randint(1000, 9999)) for _ in range(4)] for _ in range(20)]
+
+def recompress(img_bytes, quality, scale=1.0):
+    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+    if scale != 1.0:
+        img = img.resize((int(img.width * scale), int(img.height * scale)))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+# Test 1: Recompressed / rescaled copies are confirmed duplicates
+@pytest.mark.parametrize("quality, scale", [
+    (35, 1.0),    # WhatsApp-style recompression
+    (70, 0.75),   # forwarded at a lower resolution
+])
+def test_near_duplicates_match(quality, scale):
+    """Proves a degraded copy of the same page passes both the hash filter and the content check."""
+    original = page_fingerprint(register_page(random_values(1)))
+    copy = page_fingerprint(recompress(register_page(random_values(1)), quality, scale))
+    assert hamming(original.phash, copy.phash) <= DEFAULT_THRESHOLD
+    assert same_content(original, copy)
+
+# Test 2: Same register, different values: the hash can't tell, the content check does
+@pytest.mark.parametrize("fontsize", [7, 10])
+def test_different_values_do_not_match(fontsize):
+    """Proves pages that differ only in cell values (even a single digit) are never matched."""
+    values = random_values(1)
+    one_digit = [row[:] for row in values]
+    one_digit[7][2] = one_digit[7][2][:-1] + str((int(one_digit[7][2][-1]) + 1) % 10)
+
+    first = page_fingerprint(register_page(values, fontsize))
+    index = PerceptualHashIndex()
+    index.add(first, "full", "job-1", 0)
+    for other_values in (random_values(2), one_digit):
+        other = page_fingerprint(register_page(other_values, fontsize))
+        assert hamming(first.phash, other.phash) <= DEFAULT_THRESHOLD
+        assert index.find(other, "full") is None
+    assert index.stats["rejected_by_content_check"] == 2
+
+# Test 3: Index lookups respect scope and discard failed jobs
+def test_index_scope_and_discard():
+    """Proves entries are only reused within their scope and failed jobs leave no pending entries."""
+    fingerprint = page_fingerprint(register_page(random_values(3)))
+    index = PerceptualHashIndex()
+
+    done = index.add(fingerprint, "full", "job-1", 0)
+    done.payload = {"document": {"tables": []}}
+    index.add(fingerprint, "tables_only", "job-2", 0)
+
+    assert index.find(fingerprint, "full") is done
+    assert index.find(fingerprint, "other") is None
+
+    index.discard_job("job-2")
+    assert index.find(fingerprint, "tables_only") is None
+    assert len(index) == 1
+
+    reused = PerceptualHashIndex.reuse(done)
+    assert reused == done.payload and reused is not done.payload
@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+from core.env import find_env_file
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, logging, os
+import core.logger
+from core.excel_builder import ExcelBuilder
+builder = ExcelBuilder("in.json", "out.xlsx")
+print(json.dumps({"level": logging.getLogger("HindiExtractor").level, "parallel_min_pages": builder.parallel_min_pages}))
+"""
+
+# Test 1: The nearest .env is found from a nested working directory
+def test_find_env_file_walks_up(tmp_path):
+    nested = tmp_path / "a" / "b"
+    nested.mkdir(parents=True)
+    (tmp_path / ".env").write_text("X=1\n")
+    assert find_env_file(str(nested)) == str(tmp_path / ".env")
+
+# Test 2: Logger and ExcelBuilder settings come from .env without any extractor being built
+def test_env_file_reaches_logger_and_excel_settings(tmp_path):
+    """Proves LOG_* and EXCEL_* in .env take effect, since .env is loaded before the logger reads them."""
+    (tmp_path / ".env").write_text("LOG_LEVEL=DEBUG\nEXCEL_PARALLEL_MIN_PAGES=7\n")
+    env = {key: value for key, value in os.environ.items() if not key.startswith(("LOG_", "EXCEL_"))}
+    env["PYTHONPATH"] = PROJECT_ROOT
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=tmp_path, env=env, capture_output=True, text=True, check=True)
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    assert probe == {"level": 10, "parallel_min_pages": 7}
@@ -82,4 +82,77 @@ def test_defensive_footer_handling(temp_paths, broken_footer):
     
     # Pytest will automatically fail if an exception is raised here
     builder.build()
-    assert os.path.exists(excel_path)
\ No newline at end of file
+    assert os.path.exists(excel_path)
+
+def workbook_snapshot(path):
+    wb = load_workbook(path)
+    return [
+        (
+            ws.title,
+            sorted(str(merged) for merged in ws.merged_cells.ranges),
+            {letter: dim.width for letter, dim in ws.column_dimensions.items()},
+            {row: dim.height for row, dim in ws.row_dimensions.items() if dim.height},
+            [(cell.coordinate, cell.value, cell.font.name, cell.font.b) for row in ws.iter_rows() for cell in row],
+        )
+        for ws in wb.worksheets
+    ]
+
+def test_render_sheet_spec():
+    """Proves a page renders to a compact, picklable description with autofit widths."""
+    import pickle
+    from core.excel_builder import render_sheet
+    spec = render_sheet({
+        "main_title": "शीर्षक",
+        "tables": [{"headers": [{"column_name": "नाम"}, {"column_name": "पता"}], "rows": [["राम", "x" * 60]]}],
+    })
+    assert spec.merges == [(1, 2)]
+    assert spec.cells[0] == (1, 1, "शीर्षक", ("text", 14, True, "center"))
+    assert spec.column_widths == {1: 12, 2: 45}
+    assert pickle.loads(pickle.dumps(spec)).cells == spec.cells
+
+@pytest.mark.parametrize("use_legacy_font", [False, True])
+def test_parallel_render_matches_serial(tmp_path, use_legacy_font):
+    """Proves the process-pool path assembles the same workbook, in page order, as the serial path."""
+    json_path = str(tmp_path / "input.json")
+    pages = [
+        {"document": {
+            "main_title": {"text": f"पृष्ठ {n}", "is_bold": True, "font_size": 14},
+            "tables": [{"headers": [{"column_name": "क्रम"}, {"column_name": "नाम"}], "rows": [[str(i), "श्री " * n] for i in range(5)]}],
+            "footer": ["हस्ताक्षर", str(n)],
+        }}
+        for n in range(6)
+    ]
+    write_dummy_json(json_path, {"pages": pages})
+
+    serial_path, parallel_path = str(tmp_path / "serial.xlsx"), str(tmp_path / "parallel.xlsx")
+    ExcelBuilder(json_path, serial_path, use_legacy_font=use_legacy_font, parallel_min_pages=100).build()
+    ExcelBuilder(json_path, parallel_path, use_legacy_font=use_legacy_font, render_workers=2, parallel_min_pages=2).build()
+
+    serial, parallel = workbook_snapshot(serial_path), workbook_snapshot(parallel_path)
+    assert [sheet[0] for sheet in parallel] == [f"Page {n + 1}" for n in range(6)]
+    assert parallel == serial
+
+def test_render_pool_is_reused(tmp_path):
+    """Proves consecutive parallel builds share one process pool instead of spawning a new one each time."""
+    from core import excel_builder
+    json_path = str(tmp_path / "input.json")
+    write_dummy_json(json_path, {"pages": [{"document": {"main_title": f"पृष्ठ {n}", "tables": []}} for n in range(4)]})
+
+    ExcelBuilder(json_path, str(tmp_path / "first.xlsx"), render_workers=2, parallel_min_pages=2).build()
+    pool = excel_builder._render_pool
+    ExcelBuilder(json_path, str(tmp_path / "second.xlsx"), render_workers=2, parallel_min_pages=2).build()
+    assert pool is not None and excel_builder._render_pool is pool
+
+@pytest.mark.parametrize("affinity, cpu_count, expected", [
+    (set(range(64)), 64, 4),    # big host: capped
+    ({0}, 64, 1),               # container pinned to one CPU of a big host
+    (None, 2, 2),               # no affinity API (macOS / Windows)
+])
+def test_default_render_workers(monkeypatch, affinity, cpu_count, expected):
+    from core.excel_builder import default_render_workers
+    if affinity is None:
+        monkeypatch.delattr(os, "sched_getaffinity", raising=False)
+    else:
+        monkeypatch.setattr(os, "sched_getaffinity", lambda pid: affinity, raising=False)
+    monkeypatch.setattr(os, "cpu_count", lambda: cpu_count)
+    assert default_render_workers() == expected
@@ -1,5 +1,5 @@
 import pytest
-from core.font_converter import unicode_to_krutidev
+from core.font_converter import unicode_to_krutidev, krutidev_to_unicode
 
 @pytest.mark.parametrize("original, expected_inclusion, expected_exclusion", [
     # 1. Punctuation Fallback Hack
@@ -38,4 +38,32 @@ def test_font_converter_edge_cases(original, expected_inclusion, expected_exclus
 @pytest.mark.parametrize("empty_input", ["", None])
 def test_empty_string_handling(empty_input):
     """Ensures the algorithm doesn't crash on empty table cells."""
-    assert unicode_to_krutidev(empty_input) == ""
\ No newline at end of file
+    assert unicode_to_krutidev(empty_input) == ""
+
+
+@pytest.mark.parametrize("word", [
+    "लाभार्थियों", "सम्बन्धित", "ग्रामीण", "द्वितीय", "ब्लॉक", "कार्यालय", "प्रधानमंत्री",
+    "क्षेत्र", "श्रीमती", "ज्ञान", "धर्मेन्द्र", "शासन", "पट्टा", "हस्ताक्षर", "स्थिति",
+    "निर्णय", "आई.डी.", "माता/संरक्षक", "(हाँ)", "ऑफिस", "औरत", "ऊपर", "गौशाला", "झंडा",
+])
+def test_krutidev_round_trip(word):
+    """Proves the compiled reverse mapping undoes unicode_to_krutidev, including reph and chhoti ee."""
+    assert krutidev_to_unicode(unicode_to_krutidev(word)) == word
+
+
+@pytest.mark.parametrize("legacy, expected", [
+    ("fnYyh", "दिल्ली"),            # chhoti ee typed before a conjunct
+    ("dk;kZy;", "कार्यालय"),         # reph typed after its consonant and matra
+    ("iz/kkuea=h", "प्रधानमंत्री"),   # hand-typed Kruti Dev 010 keys
+    ('o"kZ 2024', "वर्ष 2024"),      # "k is ष on the 010 keyboard; Latin digits stay Latin
+    ("'kklu", "शासन"),              # 'k is श
+    ("mÙkj izns'k", "उत्तर प्रदेश"),  # single-key त्त
+    ("Ñf\"k", "कृषि"),               # single-key कृ, chhoti ee before ष
+    ("mn~ns';", "उद्देश्य"),         # ' is श्
+    ("ç'kklu", "प्रशासन"),           # single-key प्र
+    ("#i;s", "रुपये"),
+    ("mÙkjk[k.M", "उत्तराखण्ड"),
+    ("jkT;", "राज्य"),              # half ज closed by the aa stroke
+])
+def test_krutidev_typed_text(legacy, expected):
+    assert krutidev_to_unicode(legacy) == expected
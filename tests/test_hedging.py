@@ -0,0 +1,79 @@
+import threading
+import time
+import pytest
+from core.hedging import HedgedCaller, LatencyTracker
+
+def warmed_caller(latency=0.01, **kwargs):
+    caller = HedgedCaller(min_samples=3, **kwargs)
+    for _ in range(5):
+        caller.tracker.record("model", latency)
+    return caller
+
+# Test 1: Percentiles need enough history before hedging is trusted
+def test_latency_tracker_percentile():
+    """Proves the tracker stays silent until min_samples and then reports nearest-rank percentiles."""
+    tracker = LatencyTracker(window=10, min_samples=3)
+    tracker.record("m", 1.0)
+    tracker.record("m", 2.0)
+    assert tracker.percentile("m", 0.95) is None
+
+    for latency in (3.0, 4.0, 5.0):
+        tracker.record("m", latency)
+    assert tracker.percentile("m", 0.5) == 2.0
+    assert tracker.percentile("m", 0.95) == 5.0
+    assert tracker.percentile("other", 0.95) is None
+
+# Test 2: A stuck primary is overtaken by the hedge
+def test_slow_primary_is_hedged():
+    """Proves a request slower than the recent p95 fires a duplicate and the faster copy wins."""
+    caller = warmed_caller(budget_ratio=1.0)
+    calls = []
+    release_primary = threading.Event()
+
+    def flaky_page():
+        calls.append(1)
+        if len(calls) == 1:
+            release_primary.wait(2)  # the "stuck" first request
+            return "primary"
+        return "hedge"
+
+    assert caller.call(flaky_page, key="model") == "hedge"
+    release_primary.set()
+
+    stats = caller.report()
+    assert stats["hedges_fired"] == 1
+    assert stats["hedge_wins"] == 1
+    assert stats["hedge_win_rate"] == 1.0
+
+# Test 3: Fast requests never hedge
+def test_fast_primary_is_not_hedged():
+    """Proves requests inside the latency percentile cost exactly one call."""
+    caller = warmed_caller(latency=1.0)
+    assert caller.call(lambda: "ok", key="model") == "ok"
+    assert caller.report()["hedges_fired"] == 0
+
+# Test 4: The hedge budget protects the rate limit
+def test_budget_exhaustion_denies_hedges():
+    """Proves no duplicate is sent once the hedge budget is spent."""
+    caller = warmed_caller(budget_ratio=0.0, burst=0)
+    calls = []
+
+    def slow_page():
+        calls.append(1)
+        time.sleep(0.1)
+        return "primary"
+
+    assert caller.call(slow_page, key="model") == "primary"
+    assert len(calls) == 1
+    assert caller.report()["budget_denied"] == 1
+
+# Test 5: Errors still surface
+def test_primary_error_propagates():
+    """Proves an API error is raised to the caller instead of being swallowed by the hedger."""
+    caller = HedgedCaller()
+
+    def broken_page():
+        raise RuntimeError("429 RESOURCE_EXHAUSTED")
+
+    with pytest.raises(RuntimeError, match="429"):
+        caller.call(broken_page, key="model")
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 🚀 Cold-start budget for the extraction core (measured ~0.01s locally; the heavy SDKs alone cost ~0.6s)
+IMPORT_BUDGET_SECONDS = 0.25
+
+HEAVY_MODULES = ["fitz", "google.genai", "json_repair", "dotenv"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import core.config, core.logger, core.ai_extractor
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+def run_probe(cwd):
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+# Test 1: Heavy dependencies must not be imported by simply importing the core modules
+def test_core_import_is_lazy(tmp_path):
+    """Proves PyMuPDF, the Gemini SDK, json_repair and dotenv load on first use, not at import."""
+    probe = run_probe(cwd=tmp_path)
+    assert probe["loaded"] == []
+
+# Test 2: Import-time budget (best of 3 fresh interpreters to absorb CI noise)
+def test_core_import_time_budget(tmp_path):
+    """Proves a fresh interpreter imports the extraction core within the cold-start budget."""
+    best = min(run_probe(cwd=tmp_path)["elapsed"] for _ in range(3))
+    assert best < IMPORT_BUDGET_SECONDS, f"Core import took {best:.3f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+
+# Test 3: The logger must not touch the disk at import time
+def test_logger_does_not_create_log_file_on_import(tmp_path):
+    """Proves app.log is only created once something is actually logged."""
+    run_probe(cwd=tmp_path)
+    assert not (tmp_path / "app.log").exists()
+
+# Test 4: The lazy proxies still resolve to the real SDK on first use
+@pytest.mark.parametrize("proxy_name, attribute", [("genai", "Client"), ("types", "Part"), ("json_repair", "loads")])
+def test_lazy_proxies_resolve(proxy_name, attribute):
+    """Proves module-level proxies behave like the real modules once touched."""
+    import core.ai_extractor as ai_extractor
+    assert hasattr(getattr(ai_extractor, proxy_name), attribute)
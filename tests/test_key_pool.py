@@ -0,0 +1,78 @@
+import pytest
+from core.key_pool import KeyPool, is_rate_limit_error, mask_key
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def make_pool(n_keys=2, rpm=12, quarantine=60):
+    clock = FakeClock()
+    pool = KeyPool([f"KEY_{i}_SECRET" for i in range(n_keys)], client_factory=lambda key: f"client-for-{key}",
+                   requests_per_minute=rpm, quarantine_seconds=quarantine, clock=clock, sleep=clock.sleep)
+    return pool, clock
+
+# Test 1: Least-loaded selection spreads concurrent pages across keys
+def test_least_loaded_selection():
+    """Proves concurrent requests land on different keys before any key is reused."""
+    pool, _ = make_pool(n_keys=3, rpm=0)
+    first, second, third = pool.acquire(), pool.acquire(), pool.acquire()
+    assert len({first.label, second.label, third.label}) == 3
+
+    pool.release(second, latency=0.5)
+    assert pool.acquire() is second  # the only key with nothing in flight
+
+# Test 2: Per-key pacing replaces the global 5-second sleep
+def test_per_key_rate_limiter_waits_for_slot():
+    """Proves a key is not reused before its pacing interval, while other keys serve immediately."""
+    pool, clock = make_pool(n_keys=2, rpm=12)  # one request per key every 5 seconds
+    start = clock.now
+    for _ in range(2):
+        pool.release(pool.acquire(), latency=0.1)
+    assert clock.now == start  # two keys -> two immediate requests
+
+    pool.release(pool.acquire(), latency=0.1)
+    assert clock.now == start + 5  # third request had to wait for a slot
+
+# Test 3: 429 quarantine
+def test_rate_limited_key_is_quarantined():
+    """Proves a key that returned 429 is skipped until its quarantine expires, and all-quarantined fails fast."""
+    pool, clock = make_pool(n_keys=2, rpm=0, quarantine=60)
+    bad = pool.acquire()
+    pool.release(bad, latency=0.2, error=RuntimeError("429 RESOURCE_EXHAUSTED"))
+    assert pool.available_keys() == 1
+    assert pool.acquire() is not bad
+
+    other = pool.keys[0] if pool.keys[1] is bad else pool.keys[1]
+    pool.release(other, latency=0.2, error=RuntimeError("429 Too Many Requests"))
+    with pytest.raises(RuntimeError, match="RESOURCE_EXHAUSTED"):
+        pool.acquire()
+
+    clock.now += 61
+    assert pool.available_keys() == 2
+
+# Test 4: Metrics never leak the key itself
+def test_usage_metrics_are_masked():
+    """Proves per-key metrics are reported under a masked label."""
+    pool, _ = make_pool(n_keys=1, rpm=0)
+    key = pool.acquire()
+    pool.release(key, latency=1.25)
+    report = pool.report()
+
+    assert list(report) == ["key-1 (…CRET)"]
+    assert report["key-1 (…CRET)"]["successes"] == 1
+    assert report["key-1 (…CRET)"]["total_latency_s"] == 1.25
+    assert "KEY_0_SECRET" not in str(report)
+
+@pytest.mark.parametrize("error, expected", [
+    (RuntimeError("429 RESOURCE_EXHAUSTED"), True),
+    (RuntimeError("500 INTERNAL"), False),
+])
+def test_rate_limit_detection(error, expected):
+    assert is_rate_limit_error(error) is expected
+    assert mask_key("abc") == "…"
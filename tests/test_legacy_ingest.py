@@ -0,0 +1,91 @@
+import json
+import pytest
+from openpyxl import Workbook
+from openpyxl.styles import Font
+from core.excel_builder import ExcelBuilder
+from core.legacy_ingest import ingest_legacy_workbook, is_legacy_font
+
+DOCUMENT = {
+    "main_title": {"text": "कार्यालय जिला पंचायत", "is_bold": True, "font_size": 14},
+    "subtitles": [{"text": "लाभार्थियों की सूची", "is_bold": True, "font_size": 12}],
+    "tables": [
+        {
+            "table_title": "ग्रामीण क्षेत्र",
+            "headers": [{"column_name": "क्रमांक", "is_bold": True}, {"column_name": "नाम", "is_bold": True}, {"column_name": "राशि", "is_bold": True}],
+            "rows": [["1", "श्रीमती सम्बन्धित", "500"], ["2", "द्वितीय ब्लॉक", ""]],
+        },
+        {
+            "table_title": "",
+            "headers": [{"column_name": "विकास खण्ड", "is_bold": True}, {"column_name": "स्थिति", "is_bold": True}],
+            "rows": [["प्रधानमंत्री", "निर्णय"]],
+        },
+    ],
+    "footer": {"text": "हस्ताक्षर\nदिनांक", "is_bold": False, "font_size": 11},
+}
+
+# Test 1: ExcelBuilder output (Kruti Dev or Unicode) reads back into the same document
+@pytest.mark.parametrize("use_legacy_font, font_name", [
+    (True, "Kruti Dev 010"),
+    (True, "DevLys 010"),
+    (False, "Kruti Dev 010"),
+])
+def test_round_trip_through_excel_builder(tmp_path, use_legacy_font, font_name):
+    """Proves titles, table titles, headers, rows and footer survive export + ingest across several sheets."""
+    json_path, excel_path = tmp_path / "input.json", tmp_path / "Register.xlsx"
+    json_path.write_text(json.dumps({"pages": [{"document": DOCUMENT}, {"document": DOCUMENT}]}, ensure_ascii=False), encoding="utf-8")
+    ExcelBuilder(str(json_path), str(excel_path), use_legacy_font=use_legacy_font, legacy_font_name=font_name).build()
+
+    result = ingest_legacy_workbook(str(excel_path))
+
+    assert result["recommended_filename"] == "Register_Unicode"
+    assert [page["document"] for page in result["pages"]] == [DOCUMENT, DOCUMENT]
+
+# Test 2: Only legacy-font cells are converted
+def test_only_legacy_cells_are_converted(tmp_path):
+    """Proves Latin text in a normal font is left alone while Kruti Dev cells become Unicode."""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["dk;kZy;", "fnYyh", 12.0])
+    ws.append(["dk;kZy;", "fnYyh", 7])
+    for cell in ws[1] + ws[2][:1]:
+        cell.font = Font(name="Kruti Dev 010", bold=cell.row == 1)
+    path = tmp_path / "typed.xlsx"
+    wb.save(str(path))
+
+    table = ingest_legacy_workbook(str(path))["pages"][0]["document"]["tables"][0]
+    assert table["headers"] == [
+        {"column_name": "कार्यालय", "is_bold": True},
+        {"column_name": "दिल्ली", "is_bold": True},
+        {"column_name": "12", "is_bold": True},
+    ]
+    assert table["rows"] == [["कार्यालय", "fnYyh", "7"]]
+
+# Test 3: Empty workbooks are rejected
+def test_empty_workbook(tmp_path):
+    path = tmp_path / "empty.xlsx"
+    Workbook().save(str(path))
+    with pytest.raises(ValueError):
+        ingest_legacy_workbook(str(path))
+
+# Test 4: A blank row inside a register does not end its table
+def test_blank_row_inside_table(tmp_path):
+    """Proves rows after a blank line stay in the table while a bold header after a blank line starts a new one."""
+    wb = Workbook()
+    ws = wb.active
+    for values in [["dza", "uke", "jkf'k"], [1, "jke", 500], [], [2, "';ke", 700], [], ["[k.M", "fLFkfr"], ["d", "[k"]]:
+        ws.append(values)
+    for row in ws.iter_rows():
+        for cell in row:
+            cell.font = Font(name="Kruti Dev 010", bold=cell.row in (1, 6))
+    path = tmp_path / "register.xlsx"
+    wb.save(str(path))
+
+    tables = ingest_legacy_workbook(str(path))["pages"][0]["document"]["tables"]
+    assert [header["column_name"] for header in tables[0]["headers"]] == ["क्रं", "नाम", "राशि"]
+    assert tables[0]["rows"] == [["1", "राम", "500"], ["2", "श्याम", "700"]]
+    assert [header["column_name"] for header in tables[1]["headers"]] == ["खण्ड", "स्थिति"]
+    assert len(tables) == 2
+
+@pytest.mark.parametrize("font_name, expected", [("Kruti Dev 010", True), ("DevLys 010", True), ("Nirmala UI", False), (None, False)])
+def test_is_legacy_font(font_name, expected):
+    assert is_legacy_font(font_name) is expected
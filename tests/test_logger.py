@@ -0,0 +1,98 @@
+import json
+import sys
+import logging
+import logging.handlers
+import uuid
+import pytest
+from core.logger import setup_logger, stop_logger, log_context, set_log_page, JsonFormatter
+
+# 🚀 PYTEST FIXTURE: Builds an isolated logger and always stops its background listener
+@pytest.fixture
+def make_logger(tmp_path):
+    created = []
+
+    def _make(**kwargs):
+        log_file = tmp_path / "test.log"
+        logger = setup_logger(name=f"test-{uuid.uuid4().hex}", log_file=str(log_file), **kwargs)
+        logger.propagate = False
+        created.append(logger)
+        return logger, log_file
+
+    yield _make
+    for logger in created:
+        stop_logger(logger)
+
+def read_records(logger, log_file):
+    stop_logger(logger)  # flushes the queue before reading
+    return [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+
+# Test 1: Callers only ever touch the queue
+def test_hot_path_is_queue_based(make_logger):
+    """Proves the logger's only direct handler is a QueueHandler (disk I/O happens on the listener thread)."""
+    logger, _ = make_logger()
+    assert len(logger.handlers) == 1
+    assert isinstance(logger.handlers[0], logging.handlers.QueueHandler)
+
+# Test 2: Structured records carry the correlation ID and page number
+def test_json_records_carry_job_and_page(make_logger):
+    """Proves JSON output includes the job ID and page set through log_context."""
+    logger, log_file = make_logger(json_format=True)
+    with log_context(job_id="job-123"):
+        logger.info("document level")
+        set_log_page(3)
+        logger.info("page level")
+    logger.info("outside")
+
+    records = read_records(logger, log_file)
+    assert [(r["job_id"], r["page"]) for r in records] == [("job-123", None), ("job-123", 3), ("-", None)]
+    assert records[1]["message"] == "page level"
+
+# Test 3: Level gating keeps DEBUG hot-path lines out of production logs
+def test_debug_lines_are_gated(make_logger):
+    """Proves per-page DEBUG lines are dropped at the default INFO level."""
+    logger, log_file = make_logger(json_format=True, level="INFO")
+    logger.debug("Sending Page %d", 1)
+    logger.info("kept")
+    assert [r["message"] for r in read_records(logger, log_file)] == ["kept"]
+
+# Test 4: Rotation strategy is configurable
+@pytest.mark.parametrize("rotation, expected_handler", [
+    ("size", logging.handlers.RotatingFileHandler),
+    ("time", logging.handlers.TimedRotatingFileHandler),
+])
+def test_rotation_handlers(make_logger, rotation, expected_handler):
+    """Proves app.log is rotated by size or time instead of growing forever."""
+    logger, _ = make_logger(rotation=rotation, max_bytes=1024, backup_count=2)
+    file_handlers = [h for h in logger.queue_listener.handlers if isinstance(h, logging.FileHandler)]
+    assert len(file_handlers) == 1
+    assert type(file_handlers[0]) is expected_handler
+
+# Test 5: Tracebacks stay out of the message
+def test_json_formatter_includes_exception():
+    """Proves tracebacks survive structured formatting."""
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("x").makeRecord("x", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+    payload = json.loads(JsonFormatter().format(record))
+    assert "ValueError: boom" in payload["exc_info"]
+
+# Test 6: Exceptions logged through the queue keep their own JSON field
+@pytest.mark.parametrize("json_format", [True, False])
+def test_exception_through_queue(make_logger, json_format):
+    """Proves lg.exception() reaches the file with the traceback separate from the message."""
+    logger, log_file = make_logger(json_format=json_format)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed on %s", "page 2")
+
+    if json_format:
+        record, = read_records(logger, log_file)
+        assert record["message"] == "failed on page 2"
+        assert "Traceback" in record["exc_info"] and "ValueError: boom" in record["exc_info"]
+    else:
+        stop_logger(logger)
+        first_line, *traceback_lines = log_file.read_text(encoding="utf-8").splitlines()
+        assert first_line.endswith("failed on page 2")
+        assert traceback_lines[0].startswith("Traceback") and traceback_lines[-1] == "ValueError: boom"
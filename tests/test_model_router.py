@@ -0,0 +1,34 @@
+import pytest
+from core.model_router import ModelRouter, page_quality_issues
+
+def page(tables, **extra):
+    return {"document": dict(tables=tables, **extra)}
+
+GOOD_TABLE = {"headers": [{"column_name": "क्रम"}, {"column_name": "नाम"}], "rows": [["1", "राम"], ["2", "श्याम"]]}
+
+# Test 1: The cheap checks that decide escalation
+@pytest.mark.parametrize("parsed, parse_failed, expected", [
+    (page([GOOD_TABLE]), False, []),
+    (page([GOOD_TABLE]), True, ["parse_failure"]),
+    (page([]), False, ["empty_tables"]),
+    (page([{"headers": GOOD_TABLE["headers"], "rows": [["1", "राम"], ["2"]]}]), False, ["ragged_rows"]),
+    (page([{"headers": GOOD_TABLE["headers"], "rows": [["1", "Ram"]]}]), False, ["latin_characters"]),
+    (page([GOOD_TABLE], footer={"text": "Note: see annexure"}), False, ["latin_characters"]),
+    ("not even a dict", True, ["parse_failure", "empty_tables"]),
+])
+def test_page_quality_issues(parsed, parse_failed, expected):
+    """Proves parse failures, empty/ragged tables and Latin script are flagged, and clean pages pass."""
+    assert page_quality_issues(parsed, parse_failed=parse_failed) == expected
+
+# Test 2: Per-tier latency and decision report
+def test_router_report_aggregates_per_tier():
+    """Proves every routing decision is recorded and summarised per model tier."""
+    router = ModelRouter(["fast-model", "strong-model"])
+    router.record(page=1, tier=0, latency=0.5, issues=[], accepted=True)
+    router.record(page=2, tier=0, latency=0.7, issues=["ragged_rows"], accepted=False)
+    router.record(page=2, tier=1, latency=2.0, issues=[], accepted=True)
+
+    report = router.report()
+    assert report["tiers"]["fast-model"] == {"calls": 2, "accepted": 1, "escalated": 1, "mean_latency_s": 0.6, "max_latency_s": 0.7}
+    assert report["tiers"]["strong-model"]["calls"] == 1
+    assert [d["model"] for d in report["decisions"]] == ["fast-model", "fast-model", "strong-model"]
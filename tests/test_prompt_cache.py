@@ -0,0 +1,142 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from core.prompt_cache import PromptCache, is_cache_error, prompt_digest
+
+class FakeCaches:
+    """Local stand-in for client.caches: keeps cached contents in a dict and logs every call."""
+
+    def __init__(self, fail_create=False):
+        self.fail_create = fail_create
+        self.store = {}
+        self.calls = []
+        self._next = 0
+
+    def create(self, model, config):
+        self.calls.append("create")
+        if self.fail_create:
+            raise RuntimeError("400 INVALID_ARGUMENT: Cached content is too small.")
+        self._next += 1
+        name = f"cachedContents/{self._next}"
+        self.store[name] = SimpleNamespace(name=name, model=model, display_name=config.display_name,
+                                           contents=config.contents, ttl=config.ttl, expire_time=None)
+        return self.store[name]
+
+    def update(self, name, config):
+        self.calls.append("update")
+        self.store[name].ttl = config.ttl
+        return self.store[name]
+
+    def delete(self, name):
+        self.calls.append("delete")
+        self.store.pop(name, None)
+
+    def list(self):
+        self.calls.append("list")
+        return list(self.store.values())
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_cache(clock, **kwargs):
+    return PromptCache(ttl_seconds=3600, refresh_margin_seconds=300, retry_after_seconds=600, clock=clock, **kwargs)
+
+# Test 1: Created once, then reused until close to expiry, then refreshed
+def test_create_reuse_and_refresh():
+    """Proves the cache is created on first use, hit afterwards and has its TTL extended near expiry."""
+    clock, backend = FakeClock(), FakeCaches()
+    client = SimpleNamespace(caches=backend)
+    cache = make_cache(clock)
+
+    first = cache.cached_name("key-1", client, "model-a", "full", "PROMPT")
+    assert backend.store[first].contents == ["PROMPT"]
+    assert cache.cached_name("key-1", client, "model-a", "full", "PROMPT") == first
+
+    clock.now += 3400
+    assert cache.cached_name("key-1", client, "model-a", "full", "PROMPT") == first
+    assert backend.calls == ["list", "create", "update"]
+
+    # Fully expired: a new cache is created
+    clock.now += 4000
+    assert cache.cached_name("key-1", client, "model-a", "full", "PROMPT") != first
+    assert cache.report()["created"] == 2
+
+# Test 2: A prompt change replaces the old cache
+def test_invalidation_on_prompt_change():
+    """Proves the stale cache is deleted and a fresh one is created."""
+    clock, backend = FakeClock(), FakeCaches()
+    client = SimpleNamespace(caches=backend)
+    cache = make_cache(clock)
+
+    old = cache.cached_name("key-1", client, "model-a", "full", "PROMPT")
+    new = cache.cached_name("key-1", client, "model-a", "full", "PROMPT v2")
+
+    assert new != old
+    assert old not in backend.store
+    assert cache.report()["invalidated"] == 1
+
+# Test 2b: Routing tiers alternating on one key each keep their own cache
+def test_models_keep_separate_caches():
+    """Proves fast and strong tier calls hit their own caches instead of replacing each other."""
+    clock, backend = FakeClock(), FakeCaches()
+    client = SimpleNamespace(caches=backend)
+    cache = make_cache(clock)
+
+    names = [cache.cached_name("key-1", client, model, "full", "PROMPT") for model in ["fast", "strong"] * 3]
+
+    assert names[0::2] == [names[0]] * 3 and names[1::2] == [names[1]] * 3 and names[0] != names[1]
+    assert backend.calls == ["list", "create", "create"]
+    assert sorted(cached.display_name.rsplit("-", 1)[0] for cached in backend.store.values()) == ["hindiscan-full-fast", "hindiscan-full-strong"]
+    assert cache.report()["hits"] == 4 and cache.report()["invalidated"] == 0
+
+# Test 3: Creation failures fall back to the inline prompt and back off
+def test_fallback_when_unavailable():
+    """Proves a failed creation returns None and isn't retried until the back-off expires."""
+    clock, backend = FakeClock(), FakeCaches(fail_create=True)
+    client = SimpleNamespace(caches=backend)
+    cache = make_cache(clock)
+
+    assert cache.cached_name("key-1", client, "model-a", "full", "PROMPT") is None
+    assert cache.cached_name("key-1", client, "model-a", "full", "PROMPT") is None
+    assert backend.calls.count("create") == 1
+
+    clock.now += 601
+    backend.fail_create = False
+    assert cache.cached_name("key-1", client, "model-a", "full", "PROMPT") is not None
+    assert cache.report()["fallbacks"] == 2
+
+# Test 4: Caches found on the server are adopted only on an exact match and never deleted
+def test_adopts_existing_caches_after_restart():
+    """Proves a new process reuses a matching live cache and leaves other runs' caches alone."""
+    clock, backend = FakeClock(), FakeCaches()
+    client = SimpleNamespace(caches=backend)
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    previous = make_cache(clock, now=lambda: now).cached_name("key-1", client, "model-a", "full", "PROMPT")
+    backend.store[previous].expire_time = now + timedelta(minutes=50)
+    other = backend.create("model-a", SimpleNamespace(display_name=f"hindiscan-full-model-a-{prompt_digest('model-a', 'OTHER')}",
+                                                      contents=["OTHER"], ttl="60s"))
+    other.expire_time = now + timedelta(minutes=55)
+    backend.calls.clear()
+
+    restarted = make_cache(clock, now=lambda: now)
+    assert restarted.cached_name("key-1", client, "model-a", "full", "PROMPT") == previous
+    assert restarted.cached_name("key-1", client, "model-a", "tables_only", "NEW") not in (None, other.name)
+    # A prompt change only deletes what this process created; the adopted cache belongs to someone else
+    assert restarted.cached_name("key-1", client, "model-a", "full", "PROMPT v2") not in (previous, other.name)
+    assert previous in backend.store and other.name in backend.store
+    assert backend.calls == ["list", "create", "create"]
+    assert restarted.report()["adopted"] == 1
+
+# Test 5: Errors that mean "your cached content is gone"
+@pytest.mark.parametrize("message, expected", [
+    ("404 NOT_FOUND: CachedContent not found (or permission denied)", True),
+    ("400 INVALID_ARGUMENT: cached_content has expired", True),
+    ("429 RESOURCE_EXHAUSTED", False),
+])
+def test_is_cache_error(message, expected):
+    assert is_cache_error(RuntimeError(message)) is expected
@@ -0,0 +1,67 @@
+import pytest
+from core.result_cache import ResultCache, file_fingerprint
+
+SAMPLE_EXTRACTION = {"recommended_filename": "Doc", "pages": [{"document": {"tables": []}}]}
+
+# Test 1: Content hashing
+def test_fingerprint_depends_on_content_only():
+    """Proves identical bytes share a fingerprint (memoryview from Streamlit included) and edits change it."""
+    assert file_fingerprint(b"%PDF-1.7 abc") == file_fingerprint(memoryview(b"%PDF-1.7 abc"))
+    assert file_fingerprint(b"%PDF-1.7 abc") != file_fingerprint(b"%PDF-1.7 abd")
+
+# Test 2: Extraction mode is part of the key
+def test_extraction_mode_separates_entries():
+    """Proves a 'tables only' run is never served for a full-layout request (and vice versa)."""
+    cache = ResultCache()
+    full_key = ResultCache.extraction_key("hash", extract_tables_only=False)
+    tables_key = ResultCache.extraction_key("hash", extract_tables_only=True)
+    cache.put_extraction(full_key, SAMPLE_EXTRACTION)
+
+    assert cache.get_extraction(full_key) is SAMPLE_EXTRACTION
+    assert cache.get_extraction(tables_key) is None
+
+# Test 3: Export settings only select a rendered variant
+@pytest.mark.parametrize("use_legacy, font, same_as", [
+    (False, "Kruti Dev 010", (False, "DevLys 010")),   # font choice is irrelevant when legacy is off
+    (True, "Kruti Dev 010", (True, "Kruti Dev 010")),
+])
+def test_render_variants(use_legacy, font, same_as):
+    """Proves rendered workbooks are reused per export variant."""
+    cache = ResultCache()
+    key = ResultCache.extraction_key("hash", False)
+    cache.put_extraction(key, SAMPLE_EXTRACTION)
+    cache.put_render(key, ResultCache.render_variant(use_legacy, font), "Doc.xlsx", b"xlsx")
+
+    assert cache.get_render(key, ResultCache.render_variant(*same_as)) == ("Doc.xlsx", b"xlsx")
+    assert cache.get_render(key, ResultCache.render_variant(not use_legacy, font)) is None
+
+# Test 4: Re-extraction and eviction drop stale renders
+def test_new_extraction_invalidates_renders_and_evicts_lru():
+    """Proves a fresh extraction clears old workbooks and the session cache stays bounded."""
+    cache = ResultCache(max_documents=2)
+    first, second, third = (ResultCache.extraction_key(h, False) for h in ("a", "b", "c"))
+    variant = ResultCache.render_variant(False, None)
+
+    cache.put_extraction(first, SAMPLE_EXTRACTION)
+    cache.put_render(first, variant, "Doc.xlsx", b"old")
+    cache.put_extraction(first, SAMPLE_EXTRACTION)
+    assert cache.get_render(first, variant) is None
+
+    cache.put_extraction(second, SAMPLE_EXTRACTION)
+    cache.get_extraction(first)  # touch: 'second' becomes least recently used
+    cache.put_extraction(third, SAMPLE_EXTRACTION)
+    assert first in cache and third in cache and second not in cache
+    assert len(cache) == 2
+
+# Test 5: Clearing forgets every extraction and workbook
+def test_clear_drops_everything():
+    """Proves removing the uploaded file can wipe the session's documents from memory."""
+    cache = ResultCache()
+    key = ResultCache.extraction_key("hash", False)
+    variant = ResultCache.render_variant(False, None)
+    cache.put_extraction(key, SAMPLE_EXTRACTION)
+    cache.put_render(key, variant, "Doc.xlsx", b"data")
+
+    cache.clear()
+    assert key not in cache and len(cache) == 0
+    assert cache.get_render(key, variant) is None
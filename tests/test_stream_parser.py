@@ -0,0 +1,70 @@
+import json
+import pytest
+from core.stream_parser import IncrementalTableParser
+
+PAGE = {
+    "recommended_filename": "Test",
+    "document": {
+        "main_title": {"text": "शीर्षक [1] {नोट} \"उद्धरण\"", "is_bold": True, "font_size": 14},
+        "tables": [
+            {"table_title": "ग्रामीण", "headers": [{"column_name": "क्रम"}, {"column_name": "नाम"}], "rows": [["1", "राम ]"], ["2", "श्याम"]]},
+            {"headers": [{"column_name": "योग"}], "rows": [["3"]]},
+        ],
+    },
+}
+
+def feed_in_chunks(text, size):
+    events = []
+    parser = IncrementalTableParser(on_event=events.append)
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+    return parser, events
+
+# Test 1: Rows are emitted as soon as they close, regardless of chunk boundaries
+@pytest.mark.parametrize("chunk_size", [1, 7, 10000])
+def test_emits_headers_and_rows_in_order(chunk_size):
+    """Proves headers/rows stream out in document order even with brackets and quotes inside strings."""
+    text = "```json\n" + json.dumps(PAGE, ensure_ascii=False) + "\n```"
+    parser, events = feed_in_chunks(text, chunk_size)
+
+    assert [(e["type"], e["table"]) for e in events] == [
+        ("headers", 0), ("row", 0), ("row", 0), ("headers", 1), ("row", 1)
+    ]
+    assert events[2]["row"] == ["2", "श्याम"]
+    assert parser.is_complete
+
+# Test 2: Flattened output (no 'document' wrapper) streams too
+def test_flattened_shape():
+    """Proves the auto-heal shape {"tables": [...]} is understood while streaming."""
+    parser, events = feed_in_chunks(json.dumps({"tables": PAGE["document"]["tables"]}), 5)
+    assert sum(1 for e in events if e["type"] == "row") == 3
+
+# Test 3: Truncation leaves only complete rows and reports the open table
+def test_truncated_stream_keeps_complete_rows():
+    """Proves a stream cut mid-row keeps the finished rows and knows which table was interrupted."""
+    text = json.dumps(PAGE, ensure_ascii=False)
+    cut = text.index('"श्याम"') + 3
+    parser, events = feed_in_chunks(text[:cut], 4)
+
+    assert not parser.is_complete
+    assert parser.open_table == 0
+    assert parser.rows == {0: [["1", "राम ]"]]}
+
+# Test 4: Reset rolls back a failed attempt
+def test_reset_rolls_back_emitted_rows():
+    """Proves a retried stream starts from scratch and tells consumers how many rows to forget."""
+    text = json.dumps(PAGE, ensure_ascii=False)
+    events = []
+    parser = IncrementalTableParser(on_event=events.append)
+    parser.feed(text[:text.index('"श्याम"')])
+    parser.reset()
+    assert events[-1] == {"type": "rollback", "rows": 1}
+    assert parser.rows == {} and parser.headers == {}
+
+    parser.feed(text)
+    assert parser.is_complete and parser.rows[0] == [["1", "राम ]"], ["2", "श्याम"]]
+
+    # Nothing streamed yet: nothing to roll back
+    fresh_events = []
+    IncrementalTableParser(on_event=fresh_events.append).reset()
+    assert fresh_events == []
@@ -0,0 +1,115 @@
+import io
+import pytest
+from PIL import Image, ImageDraw
+from core.tiling import find_table, plan_tiles, plan_page_tiles, render_tiles, merge_tile_pages, tiles_agree
+
+def ruled_page(body_rows, row_height=20, top_margin=100, bottom_margin=80, width=600):
+    """Synthetic register: title area, a header row, `body_rows` ruled rows and a footer area."""
+    height = top_margin + (body_rows + 1) * row_height + bottom_margin
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    for line in range(body_rows + 2):
+        y = top_margin + line * row_height
+        draw.line([(20, y), (width - 20, y)], fill=0, width=2)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return img, buffer.getvalue()
+
+def a4_register(body_rows=60, multi_row_header=False, table_left=80):
+    """A4 at 150 DPI: page border, underlined title, ruled table with column lines and a footer."""
+    width, height = 1240, 1754
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([30, 30, width - 30, height - 30], outline=0, width=3)
+    draw.text((500, 70), "DISTRICT REGISTER 2024", fill=0)
+    draw.line([(420, 95), (820, 95)], fill=0, width=2)
+    left, right = table_left, width - table_left
+    edges = [160, 240, 260] if multi_row_header else [160, 220]
+    edges += [edges[-1] + 22 * (n + 1) for n in range(body_rows)]
+    for y in edges:
+        draw.line([(left, y), (right, y)], fill=0, width=2)
+    if multi_row_header:
+        draw.line([(480, 200), (900, 200)], fill=0, width=2)  # under a merged header cell only
+    for x in [left, 180, 480, 700, 900, right]:
+        draw.line([(x, edges[0]), (x, edges[-1])], fill=0, width=2)
+    for top in edges[1:-1]:
+        for x in [left, 180, 480, 700, 900]:
+            draw.text((x + 8, top + 6), str(top * 7 + x), fill=0)
+    draw.text((100, edges[-1] + 30), "Signature", fill=0)
+    buffer = io.BytesIO()
+    img.convert("RGB").save(buffer, format="JPEG", quality=80)
+    return img, buffer.getvalue(), edges
+
+# Test 1: The table is found by its own ruling lines, not the page border or title underline
+@pytest.mark.parametrize("multi_row_header, table_left, header_band", [
+    (False, 80, (160, 220)),
+    (True, 80, (160, 240)),     # two header rows with a partial line; the short column-number row is body
+    (False, 30, (160, 220)),    # table as wide as the page border
+])
+def test_find_table(multi_row_header, table_left, header_band):
+    """Proves the header band is the table's header row and the bottom border is not a body row."""
+    img, png, edges = a4_register(multi_row_header=multi_row_header, table_left=table_left)
+    table = find_table(img)
+    assert (table.top, table.bottom) == (edges[0], edges[-1])
+    assert abs(table.left - table_left) <= 2
+
+    plan = plan_page_tiles(png, rows_per_tile=25, dense_row_threshold=40)
+    assert tuple(abs(a - b) <= 1 for a, b in zip(plan.header_band, header_band)) == (True, True)
+    assert len(plan) == 3
+
+# Test 2: Only dense pages are tiled
+@pytest.mark.parametrize("body_rows, expected_tiles", [
+    (30, None),   # comfortably inside one request
+    (60, 3),      # 25 + 25 + 10 rows
+    (52, 2),      # the 2-row remainder is folded into the last band
+])
+def test_plan_tiles(body_rows, expected_tiles):
+    """Proves the tiler leaves normal pages alone and splits dense ones into row bands."""
+    img, _ = ruled_page(body_rows=body_rows)
+    plan = plan_tiles(find_table(img), img.height, rows_per_tile=25, dense_row_threshold=40)
+    if expected_tiles is None:
+        assert plan is None
+        return
+    assert len(plan) == expected_tiles
+    assert plan.bands[0][0] == 0 and plan.bands[-1][1] == img.height  # titles and footer stay covered
+    assert all(plan.bands[i][1] == plan.bands[i + 1][0] for i in range(len(plan) - 1))  # no gaps
+
+# Test 3: Later tiles carry the repeated header band
+def test_render_tiles_repeats_header():
+    """Proves every tile after the first is prefixed with the header row image."""
+    _, png = ruled_page(body_rows=60)
+    plan = plan_page_tiles(png, rows_per_tile=25, dense_row_threshold=40)
+    tiles = [Image.open(io.BytesIO(tile)) for tile in render_tiles(png, plan)]
+
+    header_height = plan.header_band[1] - plan.header_band[0] + 1
+    second_band = plan.bands[1]
+    assert tiles[1].height == header_height + (second_band[1] - second_band[0] + 1)
+
+# Test 4: Stitching back into one document
+def test_merge_tile_pages():
+    """Proves tile outputs merge into one table, dropping header rows transcribed as data."""
+    headers = [{"column_name": "क्रम"}, {"column_name": "नाम"}]
+    tiles = [
+        {"recommended_filename": "Register", "document": {"main_title": {"text": "रजिस्टर"}, "tables": [{"headers": headers, "rows": [["1", "राम"]]}], "footer": {"text": ""}}},
+        {"document": {"tables": [{"headers": headers, "rows": [["क्रम", "नाम"], ["2", "श्याम"]]}]}},
+        {"document": {"tables": [{"headers": headers, "rows": [["3", "सीता"]]}, {"headers": [{"column_name": "योग"}], "rows": [["3"]]}], "footer": {"text": "नोट:- समाप्त"}}},
+    ]
+    page = merge_tile_pages(tiles)
+
+    assert page["recommended_filename"] == "Register"
+    assert page["document"]["main_title"]["text"] == "रजिस्टर"
+    assert [t["rows"] for t in page["document"]["tables"]] == [[["1", "राम"], ["2", "श्याम"], ["3", "सीता"]], [["3"]]]
+    assert page["document"]["footer"]["text"] == "नोट:- समाप्त"
+
+# Test 5: Tiles whose headers don't line up are not stitched
+@pytest.mark.parametrize("second_headers, expected", [
+    (["क्रम", "नाम"], True),
+    (["रजिस्टर 2024"], False),   # a title band was repeated instead of the header row
+])
+def test_tiles_agree(second_headers, expected):
+    headers = [{"column_name": "क्रम"}, {"column_name": "नाम"}]
+    tiles = [
+        {"document": {"tables": [{"headers": headers, "rows": [["1", "राम"]]}]}},
+        {"document": {"tables": [{"headers": [{"column_name": name} for name in second_headers], "rows": [["2", "श्याम"]]}]}},
+    ]
+    assert tiles_agree(tiles) is expected